@@ -0,0 +1,57 @@
+# admission.py
+
+import os
+import threading
+
+
+class QueueFull(Exception):
+    """Raised when a request cannot be admitted and should be answered with 429."""
+
+
+class AdmissionControl:
+    """
+    Bounded admission for CPU-bound scoring inside a single worker process.
+
+    At most `max_concurrency` requests run inference at once; up to `max_queue`
+    more may wait `queue_timeout` seconds for a slot. Anything beyond that is
+    rejected immediately so the worker sheds load instead of piling up latency.
+    """
+
+    def __init__(self, max_concurrency=2, max_queue=16, queue_timeout=1.0):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.waiting = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the admission limits from PREDICT_* environment variables."""
+        return cls(
+            max_concurrency=int(os.environ.get('PREDICT_MAX_CONCURRENCY', 2)),
+            max_queue=int(os.environ.get('PREDICT_MAX_QUEUE', 16)),
+            queue_timeout=float(os.environ.get('PREDICT_QUEUE_TIMEOUT', 1.0)),
+        )
+
+    def __enter__(self):
+        # Fast path: a free slot means no queueing at all
+        if self._slots.acquire(blocking=False):
+            return self
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                raise QueueFull("Scoring queue is full")
+            self.waiting += 1
+        try:
+            admitted = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        if not admitted:
+            raise QueueFull("Timed out waiting for a scoring slot")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
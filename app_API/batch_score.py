@@ -0,0 +1,182 @@
+# batch_score.py
+#
+# Offline scoring of large transaction files:
+#   python batch_score.py --model model.pkl --input ../data/Fraud_Data.csv --output scores.csv --workers 8
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from model import FraudModel
+
+logger = logging.getLogger(__name__)
+
+# Model (and optional prefilter) loaded once per worker process by _init_worker
+_model = None
+_prefilter = None
+
+
+def _init_worker(model_path, prefilter_dir=None):
+    global _model, _prefilter
+    _model = FraudModel(model_path)
+    if prefilter_dir:
+        from prefilter import Prefilter
+        _prefilter = Prefilter(prefilter_dir)
+
+
+def _score_chunk(chunk, keep_columns):
+    """Score one chunk in a worker process and return the rows to write."""
+    result = chunk[keep_columns].copy() if keep_columns else pd.DataFrame(index=chunk.index)
+    if _prefilter is None:
+        predictions, probabilities = _model.predict_batch(chunk)
+        result['prediction'] = predictions.astype('uint8')
+        if probabilities is not None:
+            result['fraud_probability'] = probabilities.astype('float32')
+        return result
+
+    # Rows decided by blocklists or rules are marked as fraud and skip the model
+    reasons = _prefilter.check_batch(chunk)
+    decided = reasons.notna().to_numpy()
+    predictions = np.ones(len(chunk), dtype='uint8')
+    probabilities = np.ones(len(chunk), dtype='float32')
+    if not decided.all():
+        model_predictions, model_probabilities = _model.predict_batch(chunk[~decided])
+        predictions[~decided] = model_predictions
+        probabilities[~decided] = model_probabilities if model_probabilities is not None else np.nan
+    result['prediction'] = predictions
+    result['fraud_probability'] = probabilities
+    result['prefilter_reason'] = reasons.to_numpy()
+    return result
+
+
+def read_chunks(path, chunksize, skip_rows=0):
+    """Stream a CSV or Parquet file in chunks, starting after skip_rows data rows."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq  # Only needed for Parquet input
+        skipped = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            if skipped + batch.num_rows <= skip_rows:
+                skipped += batch.num_rows
+                continue
+            chunk = batch.to_pandas()
+            yield chunk.iloc[skip_rows - skipped:] if skipped < skip_rows else chunk
+            skipped = skip_rows
+    elif skip_rows:
+        # Skip the header and the finished lines by count (an index set of skipped rows would grow
+        # with them), then name the columns from the header line
+        header = pd.read_csv(path, nrows=0).columns
+        yield from pd.read_csv(path, chunksize=chunksize, skiprows=skip_rows + 1, header=None, names=header)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class Checkpoint:
+    """Progress of one batch-scoring job: rows scored and the matching output size in bytes."""
+
+    def __init__(self, path, input_path, output_path):
+        self.path = path
+        self.state = {'input': os.path.abspath(input_path), 'output': os.path.abspath(output_path),
+                      'rows_done': 0, 'output_bytes': 0}
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('input') != self.state['input'] or saved.get('output') != self.state['output']:
+                raise ValueError(f"Checkpoint {path} belongs to a different job.")
+            self.state = saved
+
+    @property
+    def rows_done(self):
+        return self.state['rows_done']
+
+    def save(self, rows_done, output_bytes):
+        self.state.update(rows_done=rows_done, output_bytes=output_bytes)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+def score_file(model_path, input_path, output_path, workers=None, chunksize=100000,
+               keep_columns=None, checkpoint_path=None, prefilter_dir=None):
+    """
+    Score input_path with a process pool and write predictions to output_path in input order.
+
+    Completed chunks are recorded in a checkpoint, so an interrupted run resumes
+    where it stopped instead of starting over. The checkpoint is removed on success.
+    With prefilter_dir, blocklisted and rule-matched rows are decided without the
+    model and their reason is written to a prefilter_reason column.
+    """
+    workers = workers or os.cpu_count()
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint.json", input_path, output_path)
+    rows_done = checkpoint.rows_done
+
+    # Drop anything written after the last checkpoint (e.g. a chunk cut off mid-write)
+    mode = 'w'
+    if rows_done:
+        # Resuming skips the scored input rows, so their output must still be there
+        if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint.state['output_bytes']:
+            raise ValueError(f"Checkpoint {checkpoint.path} records {rows_done} scored rows, but {output_path} "
+                             "is missing or shorter than checkpointed; remove the checkpoint to start over.")
+        with open(output_path, 'r+b') as f:
+            f.truncate(checkpoint.state['output_bytes'])
+        mode = 'a'
+        logger.info(f"Resuming after {rows_done} rows.")
+
+    start = time.perf_counter()
+    scored = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path, prefilter_dir)) as executor, \
+            open(output_path, mode, newline='') as out:
+        pending = deque()
+        chunks = read_chunks(input_path, chunksize, skip_rows=rows_done)
+
+        def write_next():
+            nonlocal rows_done, scored
+            result = pending.popleft().result()
+            result.to_csv(out, header=out.tell() == 0, index=False)
+            out.flush()
+            rows_done += len(result)
+            scored += len(result)
+            checkpoint.save(rows_done, out.tell())
+            elapsed = time.perf_counter() - start
+            logger.info(f"{rows_done} rows scored ({scored / elapsed:,.0f} rows/s).")
+
+        # Keep a bounded number of chunks in flight and write them back in submission order
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk, chunk, keep_columns))
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+
+    # The job is complete; a rerun starts from scratch
+    if os.path.exists(checkpoint.path):
+        os.remove(checkpoint.path)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Scored {scored} rows in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f} rows/s).")
+    return scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of transactions with FraudModel.")
+    parser.add_argument('--model', default=os.environ.get('MODEL_PATH', 'model.pkl'), help="Model artifact to score with")
+    parser.add_argument('--input', required=True, help="CSV or .parquet file of raw transactions")
+    parser.add_argument('--output', required=True, help="CSV file for predictions and probabilities")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=100000, help="Rows per chunk")
+    parser.add_argument('--keep-columns', nargs='*', default=None, help="Input columns copied to the output, e.g. user_id")
+    parser.add_argument('--checkpoint', default=None, help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument('--prefilter', default=None, help="Directory of blocklists and rules.json applied before the model")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    score_file(args.model, args.input, args.output, workers=args.workers, chunksize=args.chunksize,
+               keep_columns=args.keep_columns, checkpoint_path=args.checkpoint, prefilter_dir=args.prefilter)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from metrics import metrics
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions with a time-to-live.
+
+    Entries belong to one model version; the first lookup made with a different
+    version drops everything, so a hot-swap can never serve stale predictions.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from PREDICTION_CACHE_* environment variables (size 0 disables it)."""
+        return cls(
+            maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+            ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 300)),
+        )
+
+    def get(self, version, key):
+        """Return the cached prediction for key under this model version, or None."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+                self.misses += 1
+
+        metrics.inc('fraud_prediction_cache_hits_total' if entry else 'fraud_prediction_cache_misses_total')
+        return entry[1] if entry else None
+
+    def put(self, version, key, prediction):
+        with self._lock:
+            if version != self.version:
+                return  # The model was swapped while this prediction was computed
+            self._entries[key] = (time.monotonic() + self.ttl, prediction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
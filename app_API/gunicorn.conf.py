@@ -0,0 +1,51 @@
+# gunicorn.conf.py
+#
+# Production serving mode: gunicorn -c gunicorn.conf.py serve_model:app
+
+import multiprocessing
+import os
+import signal
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# One pre-forked worker per core; the model is loaded once in the master (preload_app)
+# and shared copy-on-write with every worker
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+preload_app = True
+
+# gthread workers accept and poll keep-alive connections on the main thread while
+# scoring runs on pool threads, so inference never blocks accepting connections
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
+timeout = 30
+graceful_timeout = 30
+
+
+def when_ready(server):
+    """
+    Start shadow scoring and the model watcher in the master once it is accepting connections.
+
+    New model versions are loaded and warmed in the master only, with the payloads
+    sampled from the workers' snapshot files. The HUP that
+    follows each swap makes gunicorn fork fresh workers that share the new model
+    copy-on-write and retire the old ones once they have finished their in-flight
+    requests, so workers never load or warm a model while serving. The shadow
+    scoring process is started first, before any worker is forked.
+    """
+    import routes
+    routes.start_model_watcher(on_swap=lambda model: os.kill(os.getpid(), signal.SIGHUP))
+
+
+def post_fork(server, worker):
+    """
+    Start the per-worker background tasks.
+
+    Prefilter lists are small and reloaded in each worker; drift counts and recent
+    payloads are written to snapshot files, so /drift in any worker reports the
+    traffic of all of them and the master warms new versions with live payloads.
+    """
+    import routes
+    routes.prefilter.start()
+    routes.worker_snapshots.start()
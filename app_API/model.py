@@ -1,11 +1,50 @@
 # model.py
 
+import os
+import sys
 import joblib
 import pandas as pd
+from metrics import metrics
+
+# Make the repository's scripts/ package importable so the fitted FeatureTransform can be unpickled
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from scripts.feature_transform import parse_purchase_time, transform_path
+from scripts.drift import DriftBaseline, drift_path
+from scripts.distillation import surrogate_path
+from scripts.serving_manifest import stream_sha256, verified_sidecars
+
+# Histogram holding per-phase latency of a single prediction
+PHASE_METRIC = 'fraud_model_phase_seconds'
 
 class FraudModel:
-    def __init__(self, model_path):
-        self.model = joblib.load(model_path)
+    def __init__(self, model_path, version=None):
+        # Hashed and unpickled from one open file, so a model replaced meanwhile cannot be paired
+        # with the other model's sidecars
+        with open(model_path, 'rb') as f:
+            model_sha256 = stream_sha256(f)
+            f.seek(0)
+            self.model = joblib.load(f)
+        self.version = version or os.path.basename(model_path)
+
+        # Sidecars are only used when the manifest written by ModelPipeline.export_for_serving lists
+        # them for this exact model, so files left by an earlier export are never mixed in
+        sidecars = verified_sidecars(model_path, model_sha256)
+
+        # Fitted preprocessing saved next to the model; models exported without one fall
+        # back to preprocess_input below
+        path = transform_path(model_path)
+        self.transform = joblib.load(path) if path in sidecars else None
+
+        # Training-time input distribution used for drift monitoring, when exported with the model
+        path = drift_path(model_path)
+        self.drift_baseline = DriftBaseline.load(path) if path in sidecars else None
+
+        # Distilled surrogate with an uncertain band; when present, only scores inside the
+        # band are sent to the full model
+        path = surrogate_path(model_path)
+        self.surrogate = joblib.load(path) if path in sidecars else None
 
         # Predefined mapping for countries
         self.country_mapping = {
@@ -21,40 +60,141 @@ class FraudModel:
     def encode_country(self, country):
         return self.country_mapping.get(country, -1)  # Return -1 for unknown countries
 
-    def preprocess_input(self, input_data):
-        # Create a DataFrame from the input data
-        input_df = pd.DataFrame([input_data])
+    def model_input(self, features):
+        """
+        Name the columns of a transform row before it reaches the sklearn model.
 
-        # Encode the country
-        input_df['country_encoded'] = self.encode_country(input_data['country'])
+        transform_one returns a bare array, which is what the surrogate and the cache
+        key use; the model was fitted on a DataFrame and expects its feature names.
+        """
+        if self.transform is None or isinstance(features, pd.DataFrame):
+            return features
+        return pd.DataFrame(features, columns=self.transform.feature_names_)
 
-        # One-hot encode 'source' and 'browser'
-        input_df = pd.get_dummies(input_df, columns=['source', 'browser'], prefix=['source', 'browser'])
+    def encode(self, input_data):
+        """
+        Turn one payload into the model-ready feature row.
 
-        # Extract time features from purchase_time and signup_time
-        input_df['signup_time'] = pd.to_datetime(input_df['signup_time'])
-        input_df['purchase_time'] = pd.to_datetime(input_df['purchase_time'])
+        With a fitted transform the timestamp parse is recorded as the 'parse' phase and
+        the rest of the row (scaling, one-hot and country encoding, time features) as
+        'encode'; preprocess_input records 'features' separately.
+        """
+        if self.transform is None:
+            return self.preprocess_input(input_data)
+        with metrics.timer(PHASE_METRIC, {'phase': 'parse'}):
+            purchase_time = parse_purchase_time(input_data['purchase_time'])
+        with metrics.timer(PHASE_METRIC, {'phase': 'encode'}):
+            return self.transform.transform_one(input_data, purchase_time=purchase_time)
 
-        # Extract hour and day of the week
-        input_df['hour_of_day'] = input_df['purchase_time'].dt.hour
-        input_df['day_of_week'] = input_df['purchase_time'].dt.dayofweek
+    def feature_key(self, input_data):
+        """
+        Build a hashable key that is equal for any two payloads producing the same feature vector.
 
-        # Drop original time columns as they are no longer needed
-        input_df.drop(columns=['signup_time', 'purchase_time'], inplace=True)
+        Returns (features, key). With a fitted transform the key is the encoded row itself
+        and the features are returned for reuse; otherwise only the fields the model
+        consumes are encoded in plain Python, so retries that differ in user_id,
+        signup_time or key order still match without building a DataFrame.
+        """
+        if self.transform is not None:
+            features = self.encode(input_data)
+            return features, features.tobytes()
 
-        # Set required columns dynamically based on trained model
         if not self.required_columns:
-            # Retrieve the feature names used during model training
             self.required_columns = self.model.feature_names_in_.tolist()
+        purchase_time = pd.Timestamp(input_data['purchase_time'])
+        # One slot per column, so a missing field never shifts the next one into its place
+        passthrough = tuple(input_data.get(column) for column in self.required_columns)
+        return None, (
+            self.encode_country(input_data['country']),
+            input_data.get('source'),
+            input_data.get('browser'),
+            purchase_time.hour,
+            purchase_time.dayofweek,
+        ) + passthrough
+
+    def preprocess_input(self, input_data):
+        # Phase 1: parse the raw payload into a DataFrame with typed timestamps
+        with metrics.timer(PHASE_METRIC, {'phase': 'parse'}):
+            input_df = pd.DataFrame([input_data])
+            input_df['signup_time'] = pd.to_datetime(input_df['signup_time'])
+            input_df['purchase_time'] = pd.to_datetime(input_df['purchase_time'])
+
+        # Phase 2: encode the categorical fields
+        with metrics.timer(PHASE_METRIC, {'phase': 'encode'}):
+            # Encode the country
+            input_df['country_encoded'] = self.encode_country(input_data['country'])
 
-        # Create missing columns and fill with 0
+            # One-hot encode 'source' and 'browser'
+            input_df = pd.get_dummies(input_df, columns=['source', 'browser'], prefix=['source', 'browser'], dtype='uint8')
+
+        # Phase 3: derive time features and align columns with the trained model
+        with metrics.timer(PHASE_METRIC, {'phase': 'features'}):
+            # Extract hour and day of the week
+            input_df['hour_of_day'] = input_df['purchase_time'].dt.hour
+            input_df['day_of_week'] = input_df['purchase_time'].dt.dayofweek
+
+            # Drop original time columns as they are no longer needed
+            input_df.drop(columns=['signup_time', 'purchase_time'], inplace=True)
+
+            # Set required columns dynamically based on trained model
+            if not self.required_columns:
+                # Retrieve the feature names used during model training
+                self.required_columns = self.model.feature_names_in_.tolist()
+
+            # Create missing columns and fill with 0
+            for column in self.required_columns:
+                if column not in input_df.columns:
+                    input_df[column] = 0  # Fill missing columns with default values
+
+            return input_df[self.required_columns]
+
+    def preprocess_batch(self, input_df):
+        """Vectorized equivalent of preprocess_input for a DataFrame of raw transactions."""
+        if self.transform is not None:
+            return self.transform.transform(input_df)
+
+        if not self.required_columns:
+            self.required_columns = self.model.feature_names_in_.tolist()
+        features = pd.get_dummies(input_df[['source', 'browser']], prefix=['source', 'browser'], dtype='uint8')
+        features['country_encoded'] = input_df['country'].map(self.country_mapping).fillna(-1).astype(int)
+        purchase_time = pd.to_datetime(input_df['purchase_time'])
+        features['hour_of_day'] = purchase_time.dt.hour
+        features['day_of_week'] = purchase_time.dt.dayofweek
         for column in self.required_columns:
-            if column not in input_df.columns:
-                input_df[column] = 0  # Fill missing columns with default values
+            if column not in features.columns and column in input_df.columns:
+                features[column] = input_df[column]
+        return features.reindex(columns=self.required_columns, fill_value=0)
+
+    def predict_batch(self, input_df):
+        """Score a DataFrame of raw transactions; returns (predictions, fraud probabilities or None)."""
+        features = self.preprocess_batch(input_df)
+        if self.surrogate is not None:
+            # Surrogate scores for confident rows, full-model probabilities inside the band
+            probabilities = self.surrogate.score(features)
+            predictions, uncertain = self.surrogate.decide(probabilities)
+            if uncertain.any():
+                full = self.model.predict_proba(features[uncertain])[:, 1]
+                probabilities[uncertain] = full
+                predictions[uncertain] = full >= self.surrogate.threshold
+            return predictions, probabilities
 
-        return input_df[self.required_columns]
+        predictions = self.model.predict(features)
+        probabilities = None
+        if hasattr(self.model, 'predict_proba'):
+            probabilities = self.model.predict_proba(features)[:, 1]
+        return predictions, probabilities
 
-    def predict(self, input_data):
-        input_df = self.preprocess_input(input_data)
-        prediction = self.model.predict(input_df)
+    def predict(self, input_data, features=None):
+        if features is None:
+            features = self.encode(input_data)
+        # Phase 4: model inference
+        with metrics.timer(PHASE_METRIC, {'phase': 'inference'}):
+            if self.surrogate is not None:
+                decisions, uncertain = self.surrogate.decide(self.surrogate.score(features))
+                if not uncertain[0]:
+                    metrics.inc('fraud_surrogate_decisions_total', {'path': 'surrogate'})
+                    return decisions[0]
+                metrics.inc('fraud_surrogate_decisions_total', {'path': 'fallback'})
+                return int(self.model.predict_proba(self.model_input(features))[0, 1] >= self.surrogate.threshold)
+            prediction = self.model.predict(self.model_input(features))
         return prediction[0]  # Return the first prediction
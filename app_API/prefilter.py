@@ -0,0 +1,204 @@
+# prefilter.py
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Blocklist files (one value per line) inside the prefilter directory, by payload field
+BLOCKLIST_FILES = {
+    'device_id': 'blocked_device_ids.txt',
+    'ip_address': 'blocked_ips.txt',
+    'user_id': 'blocked_users.txt',
+}
+RULES_FILE = 'rules.json'
+
+# Keys each rule type needs besides its name, and which of them name payload fields
+RULE_KEYS = {
+    'max_seconds_between': ('start', 'end', 'seconds'),
+    'range': ('field',),
+    'in': ('field', 'values'),
+}
+RULE_FIELD_KEYS = ('start', 'end', 'field')
+
+
+def _normalize(value):
+    """Canonical string form of an identifier (e.g. 7.0 and '7' are the same IP/user)."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class Blocklist:
+    """
+    Exact set of normalized identifiers.
+
+    The lists live in process memory, so a set lookup (one hash and compare) is
+    already the cheapest membership test; a Bloom filter in front of it would only
+    add hashing to every request.
+    """
+
+    def __init__(self, values):
+        self.exact = {_normalize(value) for value in values}
+
+    def __contains__(self, value):
+        return _normalize(value) in self.exact
+
+    def __len__(self):
+        return len(self.exact)
+
+
+class RuleSet:
+    """
+    Small declarative rules, evaluated per record or vectorized over a DataFrame.
+
+    Each rule is a dict with a name and one of these types:
+      {"type": "max_seconds_between", "start": "signup_time", "end": "purchase_time", "seconds": 1}
+      {"type": "range", "field": "purchase_value", "min": 0, "max": 1000}   (matches outside the range)
+      {"type": "in", "field": "country", "values": ["..."]}
+
+    Rules are validated when loaded, so a typo fails the (re)load instead of
+    silently disabling the rule. A rule is skipped for records that lack one of
+    its fields; the model decides those.
+    """
+
+    def __init__(self, rules):
+        if not isinstance(rules, list):
+            raise ValueError("Prefilter rules must be a list of rule objects.")
+        for i, rule in enumerate(rules):
+            if not isinstance(rule, dict) or 'name' not in rule:
+                raise ValueError(f"Prefilter rule {i} must be an object with a name.")
+            if rule.get('type') not in RULE_KEYS:
+                raise ValueError(f"Prefilter rule '{rule['name']}' has unknown type {rule.get('type')!r}; "
+                                 f"expected one of {sorted(RULE_KEYS)}.")
+            missing = [key for key in RULE_KEYS[rule['type']] if key not in rule]
+            if missing:
+                raise ValueError(f"Prefilter rule '{rule['name']}' is missing {missing}.")
+        self.rules = rules
+        self._fields = [[rule[key] for key in RULE_FIELD_KEYS if key in rule] for rule in rules]
+
+    def evaluate(self, record):
+        """Return the name of the first rule the record matches, or None."""
+        for rule, fields in zip(self.rules, self._fields):
+            if any(record.get(field) is None for field in fields):
+                continue
+            kind = rule['type']
+            if kind == 'max_seconds_between':
+                seconds = (pd.Timestamp(record[rule['end']]) - pd.Timestamp(record[rule['start']])).total_seconds()
+                if seconds <= rule['seconds']:
+                    return rule['name']
+            elif kind == 'range':
+                value = float(record[rule['field']])
+                if value < rule.get('min', -math.inf) or value > rule.get('max', math.inf):
+                    return rule['name']
+            elif record[rule['field']] in rule['values']:
+                return rule['name']
+        return None
+
+    def evaluate_batch(self, df):
+        """Vectorized evaluate(): the first matching rule name per row, or None."""
+        matched = pd.Series(None, index=df.index, dtype=object)
+        for rule, fields in zip(self.rules, self._fields):
+            if any(field not in df.columns for field in fields):
+                continue  # Missing values within a column never match, as in evaluate()
+            kind = rule['type']
+            if kind == 'max_seconds_between':
+                seconds = (pd.to_datetime(df[rule['end']]) - pd.to_datetime(df[rule['start']])).dt.total_seconds()
+                hit = seconds <= rule['seconds']
+            elif kind == 'range':
+                values = df[rule['field']].astype(np.float64)
+                hit = (values < rule.get('min', -math.inf)) | (values > rule.get('max', math.inf))
+            else:
+                hit = df[rule['field']].isin(rule['values'])
+            matched = matched.mask(matched.isna() & hit.to_numpy(), rule['name'])
+        return matched
+
+
+class Prefilter:
+    """
+    Decide obvious cases before preprocessing and inference.
+
+    Blocklists and rules are loaded from a directory and reloaded in the
+    background when its files change; each reload builds a fresh state and swaps
+    it in with one assignment, so lookups never see a half-loaded blocklist.
+    """
+
+    def __init__(self, directory, poll_interval=10.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._state = ({}, RuleSet([]))
+        self._signature = None
+        self.reload()
+
+    def _file_signature(self):
+        files = list(BLOCKLIST_FILES.values()) + [RULES_FILE]
+        signature = []
+        for name in files:
+            try:
+                signature.append(os.path.getmtime(os.path.join(self.directory, name)))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload(self):
+        """Load blocklists and rules from disk and swap them in."""
+        signature = self._file_signature()
+        blocklists = {}
+        for field, name in BLOCKLIST_FILES.items():
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    blocklists[field] = Blocklist(line for line in f if line.strip())
+        rules = []
+        rules_path = os.path.join(self.directory, RULES_FILE)
+        if os.path.exists(rules_path):
+            with open(rules_path) as f:
+                rules = json.load(f)
+
+        self._state = (blocklists, RuleSet(rules))
+        self._signature = signature
+        sizes = ", ".join(f"{field}: {len(blocklist)}" for field, blocklist in blocklists.items())
+        logger.info(f"Prefilter loaded ({sizes or 'no blocklists'}; {len(rules)} rules).")
+
+    def check(self, record):
+        """Return the reason a record is decided as fraud without the model, or None."""
+        blocklists, rules = self._state
+        for field, blocklist in blocklists.items():
+            value = record.get(field)
+            if value is not None and value in blocklist:
+                return f"blocked_{field}"
+        return rules.evaluate(record)
+
+    def check_batch(self, df):
+        """Vectorized check() over a DataFrame; exact sets are used directly for batches."""
+        blocklists, rules = self._state
+        reasons = rules.evaluate_batch(df)
+        for field, blocklist in reversed(list(blocklists.items())):
+            if field in df.columns:
+                hit = df[field].map(_normalize).isin(blocklist.exact).to_numpy()
+                reasons = reasons.mask(hit, f"blocked_{field}")
+        return reasons
+
+    def start(self):
+        """Poll the prefilter directory and reload when any of its files change."""
+        threading.Thread(target=self._watch, name='prefilter-watcher', daemon=True).start()
+        return self
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if self._file_signature() == self._signature:
+                continue
+            try:
+                self.reload()
+                metrics.inc('fraud_prefilter_reloads_total')
+            except Exception as e:
+                metrics.inc('fraud_prefilter_reload_errors_total', {'type': type(e).__name__})
+                logger.error(f"Failed to reload prefilter from {self.directory}: {e}")
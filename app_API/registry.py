@@ -0,0 +1,426 @@
+# registry.py
+
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from model import FraudModel
+from metrics import metrics
+from cache import PredictionCache
+from scripts.drift import DriftMonitor
+from scripts.serving_manifest import manifest_path
+from scripts.artifact_store import MODEL_FILE
+
+logger = logging.getLogger(__name__)
+
+# Used to warm a freshly loaded model when no live traffic has been seen yet
+DEFAULT_WARMUP_PAYLOAD = {
+    'user_id': 0,
+    'signup_time': '2015-01-01 00:00:00',
+    'purchase_time': '2015-01-02 12:00:00',
+    'purchase_value': 30,
+    'source': 'SEO',
+    'browser': 'Chrome',
+    'sex': 'M',
+    'age': 30,
+    'country': 'USA',
+}
+
+
+class LiveModel:
+    """
+    Holds the FraudModel currently serving traffic and swaps it atomically.
+
+    Requests read `current` exactly once, so a swap never mixes two models
+    within one prediction. Recent payloads are kept to warm the next version.
+    When a cache is given, repeated transactions skip preprocessing and inference.
+    Scored payloads feed a DriftMonitor when the model carries a drift baseline.
+    """
+
+    def __init__(self, model, shadow=None, cache=None, sample_size=32):
+        self.current = model
+        self.shadow = shadow
+        self.cache = cache
+        self.recent_payloads = deque(maxlen=sample_size)
+        self.drift = DriftMonitor(model.drift_baseline) if model.drift_baseline is not None else None
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def predict(self, input_data):
+        model = self.current
+        if self.cache is None:
+            prediction = model.predict(input_data)
+        else:
+            features, key = model.feature_key(input_data)
+            prediction = self.cache.get(model.version, key)
+            if prediction is None:
+                prediction = model.predict(input_data, features=features)
+                self.cache.put(model.version, key, prediction)
+        self.recent_payloads.append(input_data)  # Only payloads that scored successfully
+        drift = self.drift
+        if drift is not None:
+            drift.update(input_data)
+        if self.shadow is not None:
+            self.shadow.submit(input_data, prediction)
+        return prediction
+
+    def swap(self, model):
+        """Replace the serving model; in-flight requests finish on the old one."""
+        previous, self.current = self.current, model
+        # Drift is measured against the data the serving model was trained on; without a
+        # baseline there is nothing to compare the new version with
+        self.drift = DriftMonitor(model.drift_baseline) if model.drift_baseline is not None else None
+        metrics.inc('fraud_model_swaps_total')
+        logger.info(f"Model swapped from {previous.version} to {model.version}.")
+
+    def warmup_payloads(self):
+        return list(self.recent_payloads) or [DEFAULT_WARMUP_PAYLOAD]
+
+
+class WorkerSnapshots:
+    """
+    Shares each worker's drift counts and recent payloads with the other processes.
+
+    Each worker's DriftMonitor and recent payloads only cover the requests routed
+    to it. Every worker writes them to <directory>/<pid>.json every `interval`
+    seconds. report() merges the drift snapshots taken for the serving version
+    (this process's own live counts in place of its file), so /drift covers all
+    traffic; recent_payloads() lets the gunicorn master, which serves no requests,
+    warm new versions with sampled live traffic. Snapshots of other versions are
+    deleted.
+    """
+
+    def __init__(self, live_model, directory, interval=10.0):
+        self.live_model = live_model
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def start(self):
+        """Write this process's snapshot periodically (call once per worker)."""
+        threading.Thread(target=self._run, name='worker-snapshots', daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Failed to write worker snapshot to {self.path}: {e}")
+
+    def write(self):
+        live_model = self.live_model
+        drift, version = live_model.drift, live_model.version
+        _write_json(self.path, {'version': version, 'payloads': list(live_model.recent_payloads),
+                                'drift': drift.snapshot() if drift is not None else None})
+
+    def _other_snapshots(self, version):
+        """Snapshots other processes took for version; those of other versions are removed."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.json') or path == self.path:
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # Removed or replaced while listing
+            if snapshot.get('version') != version:
+                _remove_quietly(path)
+                continue
+            yield snapshot
+
+    def report(self):
+        """Drift report over the serving version's traffic in every worker, or None without a baseline."""
+        drift, version = self.live_model.drift, self.live_model.version
+        if drift is None:
+            return None
+        total = DriftMonitor(drift.baseline)
+        total.merge(drift.snapshot())
+        workers = 1
+        for snapshot in self._other_snapshots(version):
+            if snapshot['drift'] is not None:
+                total.merge(snapshot['drift'])
+                workers += 1
+        return {'workers': workers, **total.report()}
+
+    def recent_payloads(self):
+        """Recent payloads of this process and every worker, at most as many as one LiveModel keeps."""
+        live_model = self.live_model
+        payloads = list(live_model.recent_payloads)
+        for snapshot in self._other_snapshots(live_model.version):
+            payloads.extend(snapshot['payloads'])
+        return payloads[-live_model.recent_payloads.maxlen:]
+
+
+class ShadowScorer:
+    """
+    Scores a sampled share of live traffic with a candidate model in a separate process.
+
+    The candidate is loaded only in that process, so neither its memory nor its
+    scoring is paid for inside the workers serving live requests. Workers hand
+    payloads over through a bounded inter-process queue and drop them when it is
+    full, so a slow candidate can never back up live requests. The scoring process
+    counts disagreements with the live prediction and periodically writes its
+    counters and the most recent disagreements to state_path, which every worker reads.
+
+    start() must run before gunicorn forks its workers so that they share the queue.
+    """
+
+    def __init__(self, artifact, mtime, sample_rate=0.1, max_queue=1000, keep_disagreements=100,
+                 state_path=None):
+        self.artifact = artifact
+        self.mtime = mtime
+        self.version = version_name(artifact, mtime)
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.keep_disagreements = keep_disagreements
+        self.state_path = state_path or os.path.join(tempfile.gettempdir(), f"fraud-shadow-{os.getpid()}.json")
+        self._queue = None
+        self._process = None
+        self._owner = None
+
+    def start(self):
+        """Start the scoring process; returns self."""
+        context = multiprocessing.get_context()
+        self._queue = context.Queue(maxsize=self.max_queue)
+        self._owner = os.getpid()
+        # Not a daemon: forked gunicorn workers inherit the handle, and exiting workers
+        # would otherwise terminate the shared process
+        self._process = context.Process(
+            target=_score_shadow, name='shadow-scorer',
+            args=(self.artifact, self.mtime, self._queue, self.state_path, self.keep_disagreements, self._owner),
+        )
+        self._process.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the scoring process (only from the process that started it)."""
+        if self._process is None or os.getpid() != self._owner:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            self._process.terminate()
+        self._process.join(timeout)
+
+    def submit(self, input_data, live_prediction):
+        if self._queue is None or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((input_data, int(live_prediction)))
+        except queue.Full:
+            metrics.inc('fraud_shadow_dropped_total')
+
+    def status(self):
+        """Latest counters and disagreements written by the scoring process."""
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': self.version, 'scored': 0, 'disagreements': 0, 'errors': 0, 'recent': []}
+
+    def counters(self):
+        """Shadow counters in the form Metrics.render() takes as extra counters."""
+        state = self.status()
+        return {
+            'fraud_shadow_scored_total': state['scored'],
+            'fraud_shadow_disagreements_total': state['disagreements'],
+            'fraud_shadow_errors_total': state['errors'],
+        }
+
+
+def _score_shadow(artifact, mtime, work_queue, state_path, keep_disagreements, parent_pid, write_interval=1.0):
+    """Body of the shadow scoring process: score queued payloads until stopped or orphaned."""
+    model = load_version(artifact, mtime)
+    state = {'version': model.version, 'scored': 0, 'disagreements': 0, 'errors': 0, 'recent': []}
+    recent = deque(maxlen=keep_disagreements)
+    dirty, last_write = True, 0.0
+    while os.getppid() == parent_pid:
+        try:
+            item = work_queue.get(timeout=write_interval)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+        if item:
+            input_data, live_prediction = item
+            try:
+                shadow_prediction = int(model.predict(input_data))
+                state['scored'] += 1
+                if shadow_prediction != live_prediction:
+                    state['disagreements'] += 1
+                    recent.append({
+                        'input': input_data,
+                        'live_prediction': live_prediction,
+                        'shadow_prediction': shadow_prediction,
+                        'shadow_version': model.version,
+                    })
+            except Exception:
+                state['errors'] += 1
+            dirty = True
+
+        if dirty and time.monotonic() - last_write >= write_interval:
+            state['recent'] = list(recent)
+            _write_json(state_path, state)
+            dirty, last_write = False, time.monotonic()
+    state['recent'] = list(recent)
+    _write_json(state_path, state)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_json(path, state):
+    """Write state to path atomically, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def latest_artifact(path):
+    """
+    Return (artifact_path, mtime) of the newest model under a registry directory, or of a single file.
+
+    A registry directory may hold two kinds of *.pkl entries:
+
+    - a regular file: a joblib model as written by ModelPipeline.export_for_serving,
+      with its sidecars and manifest next to it;
+    - a directory <name>_v<N>.pkl/: an MLflow sklearn model directory written by
+      ArtifactManager.save_model. The artifact is its model.pkl, the sidecars sit next
+      to it, and model_manifest.json is stored last, so directories without one are
+      still being written and are skipped. Their mtime is the directory's, which
+      changes when the manifest is linked in.
+
+    Other entries (the objects/ store, staging and temporary files) are ignored.
+    """
+    if not os.path.isdir(path):
+        try:
+            return path, os.path.getmtime(path)
+        except OSError:
+            return None
+    versions = []
+    for entry in os.scandir(path):
+        if not entry.name.endswith('.pkl'):
+            continue
+        try:
+            if entry.is_file():
+                versions.append((entry.stat().st_mtime, entry.path))
+            elif entry.is_dir():
+                artifact = os.path.join(entry.path, MODEL_FILE)
+                if os.path.exists(manifest_path(artifact)):
+                    versions.append((entry.stat().st_mtime, artifact))
+        except OSError:
+            continue  # Removed while listing
+    if not versions:
+        return None
+    mtime, artifact = max(versions)
+    return artifact, mtime
+
+
+def version_name(artifact, mtime):
+    """Version label of an artifact, derived from its name (the version directory's for MLflow models) and mtime."""
+    directory, name = os.path.split(artifact)
+    if name == MODEL_FILE and directory.endswith('.pkl'):
+        name = os.path.basename(directory)
+    return f"{name}@{int(mtime)}"
+
+
+def load_version(artifact, mtime):
+    """Load one artifact as a FraudModel tagged with its version label."""
+    return FraudModel(artifact, version=version_name(artifact, mtime))
+
+
+class ModelRegistryWatcher:
+    """
+    Watch a model artifact (or a registry directory of *.pkl versions) and hot-swap new versions.
+
+    A new version is loaded and warmed on this background thread with recent
+    payloads before it is swapped in. Under gunicorn the watcher runs in the
+    master, which serves no requests, so warmup_payloads supplies the workers'
+    sampled payloads (WorkerSnapshots.recent_payloads), and on_swap rolls the
+    workers so they are forked from the master with the new model already
+    loaded; the development server swaps the model in its own process.
+    """
+
+    def __init__(self, live_model, path, poll_interval=10.0, on_swap=None, warmup_payloads=None):
+        self.live_model = live_model
+        self.warmup_payloads = warmup_payloads or live_model.warmup_payloads
+        self.path = path
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self._seen = latest_artifact(path)
+        self._failed = None  # Version whose load failed, so the retries of one bad version log once
+        self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            latest = latest_artifact(self.path)
+            if latest is None or latest == self._seen:
+                continue
+            try:
+                self.load_and_swap(*latest)
+            except Exception as e:
+                # Most likely a partially written artifact; retry on the next poll
+                metrics.inc('fraud_model_load_errors_total', {'type': type(e).__name__})
+                if latest != self._failed:
+                    logger.error(f"Failed to load model version {latest[0]}: {e}")
+                self._failed = latest
+                continue
+            self._seen = latest
+            if self.on_swap is not None:
+                self.on_swap(self.live_model.current)
+
+    def load_and_swap(self, artifact, mtime):
+        start = time.perf_counter()
+        model = load_version(artifact, mtime)
+        # Warm the new model so its first live request is not a cold start
+        for payload in self.warmup_payloads() or [DEFAULT_WARMUP_PAYLOAD]:
+            try:
+                model.predict(payload)
+            except Exception:
+                continue  # A malformed recent payload must not block the new version
+        metrics.observe('fraud_model_load_seconds', time.perf_counter() - start)
+        self.live_model.swap(model)
+
+
+def build_live_model(model_path, shadow_path=None, shadow_sample_rate=0.1, cache=None):
+    """Load the newest serving model under model_path and, when a candidate path is given, its shadow scorer."""
+    latest = latest_artifact(model_path)
+    if latest is None:
+        raise FileNotFoundError(f"No model artifact found at {model_path}")
+    shadow = None
+    if shadow_path:
+        # Only located here; the candidate is loaded by the shadow scoring process
+        candidate = latest_artifact(shadow_path)
+        if candidate is None:
+            raise FileNotFoundError(f"No shadow model artifact found at {shadow_path}")
+        shadow = ShadowScorer(*candidate, sample_rate=shadow_sample_rate)
+    if cache is None:
+        cache = PredictionCache.from_env()
+    return LiveModel(load_version(*latest), shadow=shadow, cache=cache if cache.maxsize > 0 else None)
@@ -1,14 +1,59 @@
 # routes.py
 
-from flask import Blueprint, request, jsonify, render_template
-from model import FraudModel
-import pandas as pd
+import os
+import tempfile
+import time
+from flask import Blueprint, Response, request, jsonify, render_template
+from registry import WorkerSnapshots, ModelRegistryWatcher, build_live_model
+from metrics import metrics
+from admission import AdmissionControl, QueueFull
+from prefilter import Prefilter
+from trends import TrendStore
+from scripts import schema  # Importable through the repository root path set up in model.py
 
 # Create a Blueprint for routes
 routes = Blueprint('routes', __name__)
 
-# Load the model
-model = FraudModel('model.pkl')  # Update with the correct path to your model
+# Load the model; MODEL_PATH may be a single artifact or a registry directory such as ../saved_models (see latest_artifact)
+MODEL_PATH = os.environ.get('MODEL_PATH', 'model.pkl')
+model = build_live_model(
+    MODEL_PATH,
+    shadow_path=os.environ.get('SHADOW_MODEL_PATH'),
+    shadow_sample_rate=float(os.environ.get('SHADOW_SAMPLE_RATE', 0.1)),
+)
+
+# Drift counts and recent payloads shared by all workers and the master; the directory is
+# chosen at import, i.e. once in the gunicorn master
+worker_snapshots = WorkerSnapshots(
+    model,
+    os.environ.get('DRIFT_STATE_DIR') or os.path.join(tempfile.gettempdir(), f"fraud-drift-{os.getpid()}"),
+    interval=float(os.environ.get('DRIFT_SNAPSHOT_INTERVAL', 10)),
+)
+
+# Per-worker limit on concurrent and queued scoring requests
+admission = AdmissionControl.from_env()
+
+# Merged fraud data behind the dashboard, queried server-side with filters pushed down
+FRAUD_DATA_PATH = os.environ.get('FRAUD_DATA_PATH', '../data/merged_fraud_data.csv')
+trend_store = TrendStore(FRAUD_DATA_PATH, max_points=int(os.environ.get('TREND_MAX_POINTS', 500)))
+
+# Blocklists and rules that decide obvious fraud before the model runs
+prefilter = Prefilter(os.environ.get('PREFILTER_DIR', 'prefilter'),
+                      poll_interval=float(os.environ.get('PREFILTER_POLL_INTERVAL', 10)))
+
+def start_model_watcher(poll_interval=None, on_swap=None):
+    """
+    Start the shadow scoring process and hot-swapping of new model versions in this process.
+
+    Under gunicorn this runs once in the master (see gunicorn.conf.py), with on_swap
+    rolling the workers; the development server runs it in its single process.
+    """
+    if poll_interval is None:
+        poll_interval = float(os.environ.get('MODEL_POLL_INTERVAL', 10))
+    if model.shadow is not None:
+        model.shadow.start()
+    return ModelRegistryWatcher(model, MODEL_PATH, poll_interval, on_swap=on_swap,
+                                warmup_payloads=worker_snapshots.recent_payloads).start()
 
 @routes.route('/')
 def index():
@@ -16,10 +61,21 @@ def index():
 
 @routes.route('/predict', methods=['POST'])
 def predict():
+    start = time.perf_counter()
     data = request.json
     try:
+        # Blocklisted entities and rule hits are decided without preprocessing or inference
+        reason = prefilter.check(data)
+        if reason is not None:
+            metrics.inc('fraud_prefilter_decisions_total', {'reason': reason})
+            metrics.inc('fraud_predictions_total', {'prediction': 1})
+            metrics.observe('fraud_predict_request_seconds', time.perf_counter() - start)
+            return jsonify({'prediction': 1, 'message': "The transaction is classified as **Fraud**.",
+                            'reason': reason})
+
         # Perform prediction using the model
-        prediction = model.predict(data)
+        with admission:
+            prediction = model.predict(data)
         
         # Create a descriptive message based on the prediction
         if prediction == 1:
@@ -27,18 +83,73 @@ def predict():
         else:
             message = "The transaction is classified as **Not Fraud**."
 
+        metrics.inc('fraud_predictions_total', {'prediction': int(prediction)})
+        metrics.observe('fraud_predict_request_seconds', time.perf_counter() - start)
+
         # Return a structured JSON response
         return jsonify({'prediction': int(prediction), 'message': message})
+    except QueueFull as e:
+        metrics.inc('fraud_predict_rejected_total')
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '1'}
     except Exception as e:
+        metrics.inc('fraud_predict_errors_total', {'type': type(e).__name__})
         return jsonify({'error': str(e)}), 400
 
+@routes.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Expose counters and latency histograms in the Prometheus text format
+    # Shadow scoring runs in its own process and reports its counters through a state file
+    shadow_counters = model.shadow.counters() if model.shadow else None
+    return Response(metrics.render(shadow_counters), mimetype='text/plain; version=0.0.4')
+
+@routes.route('/model', methods=['GET'])
+def model_info():
+    # Report the serving version and recent shadow disagreements
+    shadow = model.shadow.status() if model.shadow else None
+    return jsonify({
+        'version': model.version,
+        'cache_hit_rate': model.cache.hit_rate if model.cache else None,
+        'shadow_version': shadow['version'] if shadow else None,
+        'shadow_disagreements': shadow['recent'] if shadow else [],
+    })
+
+@routes.route('/drift', methods=['GET'])
+def drift():
+    # PSI/KL of live inputs, summed over every worker, against the serving model's training baseline
+    report = worker_snapshots.report()
+    if report is None:
+        return jsonify({'error': 'The serving model has no drift baseline.'}), 404
+    return jsonify({'version': model.version, **report})
+
 @routes.route('/fraud-trends', methods=['GET'])
 def fraud_trends():
     try:
-        # Load the fraud data from a CSV file
-        fraud_data = pd.read_csv('../data/merged_fraud_data.csv')
+        # Load the fraud data from a CSV file with the repository's compact schema
+        fraud_data = schema.read_csv(FRAUD_DATA_PATH, parse_dates=False)
         data= jsonify(fraud_data.to_dict(orient='records'))
         return data
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@routes.route('/fraud-trends/summary', methods=['GET'])
+def fraud_trends_summary():
+    # Dashboard aggregates for the requested date range, countries and browsers
+    try:
+        summary = trend_store.query(
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            countries=request.args.getlist('country'),
+            browsers=request.args.getlist('browser'),
+        )
+        return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@routes.route('/fraud-trends/options', methods=['GET'])
+def fraud_trends_options():
+    # Filter choices and date bounds for the dashboard controls
+    try:
+        return jsonify(trend_store.options())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,10 +1,16 @@
 # app.py
+#
+# Development: python serve_model.py
+# Production:  gunicorn -c gunicorn.conf.py serve_model:app
 
 from flask import Flask
-from routes import routes
+from routes import routes, worker_snapshots, prefilter, start_model_watcher
 
 app = Flask(__name__)
 app.register_blueprint(routes)
 
 if __name__ == '__main__':
+    start_model_watcher()
+    prefilter.start()
+    worker_snapshots.start()
     app.run(debug=True)
@@ -0,0 +1,175 @@
+# trends.py
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+# Age bins of the dashboard's age chart (left-closed, as pd.cut(..., right=False))
+AGE_BINS = [0, 18, 35, 50, 65, 100]
+AGE_LABELS = ['0-18', '19-35', '36-50', '51-65', '66+']
+
+FILTER_COLUMNS = ['country', 'browser']
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series to n_out points.
+
+    Keeps the first and last points and, from each bucket in between, the point
+    forming the largest triangle with the previously kept point and the next
+    bucket's average, which preserves peaks far better than plain averaging.
+    Returns the indices of the kept points.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out - 2 buckets over the interior points
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_stop].mean(), y[next_start:next_stop].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+class _TrendData:
+    """One loaded version of the data: columns sorted by purchase_time, categoricals as codes."""
+
+    def __init__(self, times, fraud, age, codes, categories):
+        self.times = times
+        self.fraud = fraud
+        self.age = age
+        self.codes = codes
+        self.categories = categories
+
+
+class TrendStore:
+    """
+    In-memory, time-indexed store of the merged fraud data behind the dashboard.
+
+    Rows are sorted by purchase_time once at load, so a date range is two binary
+    searches, and categorical columns are held as integer codes, so country and
+    browser filters and every chart aggregate are vectorized passes over the
+    selected slice only. The dashboard receives aggregates sized by the number
+    of categories and a downsampled time series, never the raw rows. The file is
+    reloaded when it changes on disk; a reload builds a new _TrendData and swaps
+    it in with one assignment, so a running query never mixes two versions.
+    """
+
+    def __init__(self, path, max_points=500):
+        self.path = path
+        self.max_points = max_points
+        self._mtime = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Return the current data, reloading it first when the file has changed."""
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return self._data
+        with self._lock:
+            if mtime == self._mtime:
+                return self._data
+            data = pd.read_csv(self.path, usecols=['purchase_time', 'class', 'browser', 'sex', 'age', 'country'])
+            data['purchase_time'] = pd.to_datetime(data['purchase_time'], errors='coerce')
+            data = data.dropna(subset=['purchase_time']).sort_values('purchase_time', kind='mergesort')
+
+            codes, categories = {}, {}
+            for col in ['country', 'browser', 'sex']:
+                categorical = pd.Categorical(data[col].astype(str))
+                codes[col] = categorical.codes.astype(np.int32)
+                categories[col] = categorical.categories
+            self._data = _TrendData(
+                times=data['purchase_time'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+                fraud=data['class'].to_numpy(dtype=np.int64),
+                age=data['age'].to_numpy(dtype=np.float64),
+                codes=codes,
+                categories=categories,
+            )
+            self._mtime = mtime
+            return self._data
+
+    def options(self):
+        """Filter choices and the available date range."""
+        data = self._ensure_loaded()
+        return {
+            'countries': data.categories['country'].tolist(),
+            'browsers': data.categories['browser'].tolist(),
+            'min_date': str(pd.Timestamp(data.times[0]).date()) if len(data.times) else None,
+            'max_date': str(pd.Timestamp(data.times[-1]).date()) if len(data.times) else None,
+        }
+
+    def query(self, start_date=None, end_date=None, countries=None, browsers=None):
+        """Aggregates for the dashboard over the rows matching the filters (end_date inclusive)."""
+        data = self._ensure_loaded()
+        lo = np.searchsorted(data.times, pd.Timestamp(start_date).value) if start_date else 0
+        hi = (np.searchsorted(data.times, pd.Timestamp(end_date).normalize().value + NS_PER_DAY)
+              if end_date else len(data.times))
+
+        # A date range alone is a zero-copy slice; category filters narrow it to row positions
+        selected = slice(lo, hi)
+        for col, values in zip(FILTER_COLUMNS, [countries, browsers]):
+            if values:
+                if isinstance(selected, slice):
+                    selected = np.arange(lo, hi)
+                wanted = data.categories[col].get_indexer(values)
+                selected = selected[np.isin(data.codes[col][selected], wanted[wanted >= 0])]
+
+        fraud = data.fraud[selected]
+        total = len(fraud)
+        fraud_cases = int(fraud.sum())
+        return {
+            'total_transactions': total,
+            'fraud_cases': fraud_cases,
+            'fraud_percentage': fraud_cases / total * 100 if total else 0.0,
+            'over_time': self._over_time(data.times[selected], fraud),
+            'by_browser': self._counts(data, 'browser', selected),
+            'by_sex': self._counts(data, 'sex', selected),
+            'fraud_by_country': self._counts(data, 'country', selected, weights=fraud),
+            'by_class': {'labels': [0, 1], 'counts': np.bincount(fraud, minlength=2)[:2].tolist()},
+            'by_age_bin': self._age_bins(data.age[selected]),
+        }
+
+    def _counts(self, data, col, selected, weights=None):
+        """Counts (or weighted sums) per category, omitting categories with none."""
+        categories = data.categories[col]
+        counts = np.bincount(data.codes[col][selected], weights=weights, minlength=len(categories))
+        present = np.nonzero(counts)[0]
+        return {'labels': categories[present].tolist(), 'counts': counts[present].astype(np.int64).tolist()}
+
+    def _age_bins(self, age):
+        bins = np.searchsorted(AGE_BINS, age, side='right') - 1
+        valid = (bins >= 0) & (bins < len(AGE_LABELS))
+        counts = np.bincount(bins[valid], minlength=len(AGE_LABELS))
+        return {'labels': AGE_LABELS, 'counts': counts.tolist()}
+
+    def _over_time(self, times, fraud):
+        """Daily fraud and non-fraud counts, each downsampled with LTTB to at most max_points."""
+        if not len(times):
+            return {'fraud': {'dates': [], 'counts': []}, 'non_fraud': {'dates': [], 'counts': []}}
+        days = times // NS_PER_DAY
+        first = days[0]
+        offsets = days - first
+        fraud_per_day = np.bincount(offsets, weights=fraud)
+        total_per_day = np.bincount(offsets)
+        active = np.nonzero(total_per_day)[0]  # Days with transactions, as a groupby by date would give
+        series = {'fraud': fraud_per_day[active], 'non_fraud': total_per_day[active] - fraud_per_day[active]}
+
+        result = {}
+        for name, counts in series.items():
+            keep = lttb(active, counts, self.max_points)
+            dates = ((active[keep] + first) * NS_PER_DAY).astype('datetime64[ns]').astype('datetime64[D]')
+            result[name] = {'dates': dates.astype(str).tolist(), 'counts': counts[keep].astype(np.int64).tolist()}
+        return result
@@ -2,7 +2,6 @@ import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
-import pandas as pd
 import requests
 from layouts import create_layout
 from callbacks import register_callbacks
@@ -12,21 +11,33 @@ warnings.filterwarnings('ignore')
 # Initialize Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
-# Load data from the API (flask backend)
-def load_fraud_data():
-    response = requests.get("http://localhost:5000/fraud-trends")
+# Load filtered dashboard aggregates from the API (flask backend); filtering happens server-side
+def load_fraud_summary(filters):
+    response = requests.get("http://localhost:5000/fraud-trends/summary", params=filters)
     if response.status_code == 200:
-        data = response.json()
-        return pd.DataFrame(data)  # Convert JSON response to a pandas DataFrame
-    else:
-        return pd.DataFrame()  # Return empty DataFrame on error
+        return response.json()
+    return None  # Keep the current figures on error
+
+# Load filter choices and the available date range from the API
+def load_filter_options():
+    response = requests.get("http://localhost:5000/fraud-trends/options")
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+# Load the input-drift report of live traffic from the API
+def load_drift_report():
+    response = requests.get("http://localhost:5000/drift")
+    if response.status_code == 200:
+        return response.json()
+    return None  # No baseline for the serving model, or the API is unavailable
 
 # Define layout
 # Set the layout
 app.layout = create_layout()
 
 # Register callbacks
-register_callbacks(app, load_fraud_data)
+register_callbacks(app, load_fraud_summary, load_filter_options, load_drift_report)
 
 
 # Run Dash app
@@ -1,8 +1,27 @@
 from dash.dependencies import Input, Output
-import pandas as pd
-import plotly.express as px
+from dash.exceptions import PreventUpdate
+
+# PSI above these values is usually read as moderate / significant drift
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+def register_callbacks(app, load_fraud_summary, load_filter_options, load_drift_report=None):
+    @app.callback(
+        [Output("country-filter", "options"),
+         Output("browser-filter", "options"),
+         Output("date-range", "min_date_allowed"),
+         Output("date-range", "max_date_allowed")],
+        [Input("date-range", "id")]  # Dummy input to fill the filters once on load
+    )
+    def populate_filters(_):
+        options = load_filter_options() or {'countries': [], 'browsers': [], 'min_date': None, 'max_date': None}
+        return (
+            [{'label': country, 'value': country} for country in options['countries']],
+            [{'label': browser, 'value': browser} for browser in options['browsers']],
+            options['min_date'],
+            options['max_date'],
+        )
 
-def register_callbacks(app, load_fraud_data):
     @app.callback(
         [Output("total-transactions", "children"),
          Output("fraud-cases", "children"),
@@ -13,47 +32,44 @@ def register_callbacks(app, load_fraud_data):
          Output("fraud_by_country_map", "figure"),
          Output("fraud-class", "figure"),
         Output("fraud-by-age-bin", "figure")],  # Added Output for age bin chart
-        [Input("fraud-over-time", "id")]  # Dummy input to trigger the callback
+        [Input("date-range", "start_date"),
+         Input("date-range", "end_date"),
+         Input("country-filter", "value"),
+         Input("browser-filter", "value")]
     )
-    def update_dashboard(_):
-        # Load fraud data
-        data = load_fraud_data()
-        
-        # Creating age bins
-        age_bins = [0, 18, 35, 50, 65, 100]  # Define the bins
-        age_labels = ['0-18', '19-35', '36-50', '51-65', '66+']  # Define labels for the bins
-        data['age_bin'] = pd.cut(data['age'], bins=age_bins, labels=age_labels, right=False)  # Create age bins
-        
-        total_transactions = data.shape[0]
-        fraud_cases = data[data['class'] == 1].shape[0]
-        fraud_percentage = (fraud_cases / total_transactions) * 100
+    def update_dashboard(start_date, end_date, countries, browsers):
+        # Filters are applied by the API; only aggregates and a downsampled series come back
+        summary = load_fraud_summary({
+            'start_date': start_date,
+            'end_date': end_date,
+            'country': countries or [],
+            'browser': browsers or [],
+        })
+        if summary is None:
+            raise PreventUpdate  # API unavailable; keep the current figures
 
-        # Convert 'purchase_time' to datetime format
-        data['purchase_time'] = pd.to_datetime(data['purchase_time'],errors='coerce')
+        total_transactions = summary['total_transactions']
+        fraud_cases = summary['fraud_cases']
+        fraud_percentage = summary['fraud_percentage']
 
-        # Group the data by purchase date
-        fraud_case = data[data['class'] == 1].groupby(data['purchase_time'].dt.date).size()
-        non_fraud_case = data[data['class'] == 0].groupby(data['purchase_time'].dt.date).size()
-
-        # Create a DataFrame for easier plotting
-        trend_data = pd.DataFrame({
-            'Fraud Cases': fraud_case,
-            'Non-Fraud Cases': non_fraud_case
-        }).fillna(0)  # Fill missing values with 0
+        # Daily fraud and non-fraud counts, downsampled server-side to a fixed point budget
+        fraud_series = summary['over_time']['fraud']
+        non_fraud_series = summary['over_time']['non_fraud']
+        max_cases = max(fraud_series['counts'] + non_fraud_series['counts'] + [0])
 
         # Fraud and Non-Fraud Cases Over Time
         fraud_over_time = {
             'data': [
                 {
-                    'x': trend_data.index,
-                    'y': trend_data['Fraud Cases'],
+                    'x': fraud_series['dates'],
+                    'y': fraud_series['counts'],
                     'type': 'line',
                     'name': 'Fraud Cases',
                     'line': {'color': 'red'}
                 },
                 {
-                    'x': trend_data.index,
-                    'y': trend_data['Non-Fraud Cases'],
+                    'x': non_fraud_series['dates'],
+                    'y': non_fraud_series['counts'],
                     'type': 'line',
                     'name': 'Non-Fraud Cases',
                     'line': {'color': 'blue'}
@@ -67,7 +83,7 @@ def register_callbacks(app, load_fraud_data):
                 },
                 'yaxis': {
                     'title': 'Number of Cases',
-                    'range': [0, trend_data[['Fraud Cases', 'Non-Fraud Cases']].max().max() + 10]
+                    'range': [0, max_cases + 10]
                 },
                 'hovermode': 'x unified'
             }
@@ -77,8 +93,8 @@ def register_callbacks(app, load_fraud_data):
         fraud_by_browser = {
             'data': [
                 {
-                    'x': data['browser'].unique(),
-                    'y': data.groupby('browser').size(),
+                    'x': summary['by_browser']['labels'],
+                    'y': summary['by_browser']['counts'],
                     'type': 'bar',
                     'name': 'Fraud by Browser',
                     'marker': {
@@ -107,8 +123,8 @@ def register_callbacks(app, load_fraud_data):
         fraud_by_sex = {
             'data': [
                 {
-                    'x': data['sex'].unique(),
-                    'y': data.groupby('sex').size(),
+                    'x': summary['by_sex']['labels'],
+                    'y': summary['by_sex']['counts'],
                     'type': 'bar',
                     'name': 'Fraud by Sex',
                     'marker': {
@@ -133,30 +149,34 @@ def register_callbacks(app, load_fraud_data):
         }
 
         # Fraud Counts by Country
-        fraud_counts_by_country = data[data['class'] == 1].groupby('country').size().reset_index(name='fraud_count')
+        fraud_counts_by_country = summary['fraud_by_country']
 
-        # Create a choropleth map for fraud by country
-        fraud_by_country_map = px.choropleth(
-            fraud_counts_by_country,
-            locations='country',
-            locationmode='country names',  # Use country names
-            color='fraud_count',
-            hover_name='country',
-            color_continuous_scale=px.colors.sequential.Viridis,
-            title='Fraud Cases by Country',
-            labels={'fraud_count': 'Number of Fraud Cases'}
-        )
-        # Update layout to make the map fit better
-        fraud_by_country_map.update_layout(
-            height=600,  # Set height for better visibility
-            margin=dict(l=10, r=10, t=40, b=20)  # Adjust margins to fit the map better
-        )
+        # Create a choropleth map for fraud by country (plain figure dict, no plotly.express import)
+        fraud_by_country_map = {
+            'data': [
+                {
+                    'type': 'choropleth',
+                    'locations': fraud_counts_by_country['labels'],
+                    'locationmode': 'country names',  # Use country names
+                    'z': fraud_counts_by_country['counts'],
+                    'text': fraud_counts_by_country['labels'],
+                    'colorscale': 'Viridis',
+                    'colorbar': {'title': 'Number of Fraud Cases'},
+                    'hovertemplate': '%{text}<br>Number of Fraud Cases: %{z}<extra></extra>'
+                }
+            ],
+            'layout': {
+                'title': 'Fraud Cases by Country',
+                'height': 600,  # Set height for better visibility
+                'margin': dict(l=10, r=10, t=40, b=20)  # Adjust margins to fit the map better
+            }
+        }
         # Fraud Class Analysis
         fraud_class = {
             'data': [
                 {
-                    'x': data['class'].unique(),
-                    'y': data.groupby('class').size(),
+                    'x': summary['by_class']['labels'],
+                    'y': summary['by_class']['counts'],
                     'type': 'bar',
                     'name': 'Fraud by Class',
                     'marker': {
@@ -180,15 +200,15 @@ def register_callbacks(app, load_fraud_data):
             }
         }
         
-        # Age Bin Analysis
-        age_bin_counts = data.groupby('age_bin').size().reset_index(name='fraud_count')
+        # Age Bin Analysis (bins computed server-side)
+        age_bin_counts = summary['by_age_bin']
         
         # Create a bar chart for fraud by age bin
         fraud_by_age_bin = {
             'data': [
                 {
-                    'x': age_bin_counts['age_bin'],
-                    'y': age_bin_counts['fraud_count'],
+                    'x': age_bin_counts['labels'],
+                    'y': age_bin_counts['counts'],
                     'type': 'bar',
                     'name': 'Fraud by Age Bin',
                     'marker': {
@@ -222,3 +242,41 @@ def register_callbacks(app, load_fraud_data):
             fraud_class,
             fraud_by_age_bin
         )
+
+    @app.callback(
+        Output("input-drift", "figure"),
+        [Input("drift-refresh", "n_intervals")]
+    )
+    def update_drift(_):
+        report = load_drift_report() if load_drift_report else None
+        if not report or not report.get('n_observed'):
+            return {'data': [], 'layout': {'title': 'Input Drift (no live traffic or baseline yet)'}}
+
+        features = list(report['features'])
+        psi_values = [report['features'][feature]['psi'] for feature in features]
+        colors = ['#d62728' if value >= PSI_ALERT else '#ff7f0e' if value >= PSI_WARNING else '#2ca02c'
+                  for value in psi_values]
+
+        # PSI per monitored input, with KL divergence in the hover text
+        return {
+            'data': [
+                {
+                    'x': features,
+                    'y': psi_values,
+                    'type': 'bar',
+                    'name': 'PSI',
+                    'text': [f"KL: {report['features'][feature]['kl']:.4f}" for feature in features],
+                    'marker': {'color': colors, 'line': {'width': 1.5, 'color': '#000'}}
+                }
+            ],
+            'layout': {
+                'title': f"Input Drift vs Training Baseline ({report['n_observed']} live transactions, model {report['version']})",
+                'xaxis': {'title': 'Feature'},
+                'yaxis': {'title': 'Population Stability Index'},
+                'shapes': [
+                    {'type': 'line', 'xref': 'paper', 'x0': 0, 'x1': 1, 'y0': level, 'y1': level,
+                     'line': {'dash': 'dash', 'color': color}}
+                    for level, color in [(PSI_WARNING, '#ff7f0e'), (PSI_ALERT, '#d62728')]
+                ]
+            }
+        }
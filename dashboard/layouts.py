@@ -18,6 +18,22 @@ def create_layout():
                        "fontWeight": "bold"},
                 className="mb-4",  # Margin below the navbar
             ),
+            # Filters Row: applied server-side by the API
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Purchase Date"),
+                    dcc.DatePickerRange(id="date-range", clearable=True)
+                ], width=4, className="p-2"),
+                dbc.Col([
+                    html.Label("Country"),
+                    dcc.Dropdown(id="country-filter", multi=True, placeholder="All countries")
+                ], width=4, className="p-2"),
+                dbc.Col([
+                    html.Label("Browser"),
+                    dcc.Dropdown(id="browser-filter", multi=True, placeholder="All browsers")
+                ], width=4, className="p-2"),
+            ], className="p-4 mb-4", style={"background-color": "#f8f9fa"}),
+
             # KPI Cards Row
             dbc.Row([
                 dbc.Col(dbc.Card([
@@ -63,6 +79,12 @@ def create_layout():
                 dbc.Col([dcc.Graph(id="fraud-class")], width=6, className="p-2", style={"background-color": "#f8f9fa"}),
                 dbc.Col([dcc.Graph(id="fraud-by-age-bin")], width=6, className="p-2", style={"background-color": "#f8f9fa"})
             ], className="p-4 mb-4"),
+
+            # Input Drift Row (live /predict traffic against the training baseline)
+            dbc.Row([
+                dbc.Col([dcc.Graph(id="input-drift")], width=12, className="p-2"),
+                dcc.Interval(id="drift-refresh", interval=60 * 1000)  # Refresh every minute
+            ], className="p-4 mb-4", style={"background-color": "#f8f9fa"}),
         ],
 
         fluid=True,
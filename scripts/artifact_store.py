@@ -0,0 +1,154 @@
+import os
+import re
+import queue
+import atexit
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from scripts.serving_manifest import manifest_path, write_manifest
+
+logg = logging.getLogger(__name__)
+
+# The pickled model inside an MLflow sklearn model directory, which the scoring API loads directly
+MODEL_FILE = 'model.pkl'
+
+
+class ArtifactManager:
+    """
+    Content-addressed model store with background MLflow logging.
+
+    Each model is serialized once into a staging directory. Every file is then
+    moved into objects/<sha256> (or dropped when an identical object already
+    exists) and hard-linked into the versioned model directory, so unchanged
+    transforms, baselines and repeated models take no extra space. Linked files
+    are shared between versions and must not be modified in place. Logging tasks
+    run in submission order on one background thread so training continues;
+    flush() waits for them and raises if any failed.
+    """
+
+    def __init__(self, root="../saved_models", max_pending=2):
+        """
+        root: Directory holding versioned model directories and the objects/ store.
+        max_pending: Tasks allowed to wait in the queue; submit() blocks beyond that,
+            bounding the memory held by models not yet written.
+        """
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.staging_dir = os.path.join(root, '.staging')  # Same filesystem as objects/, so moves are renames
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._errors = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def claim_version(self, name):
+        """
+        Reserve the next version directory for name and return (version, path).
+
+        Versions are read with one directory listing, and the directory is claimed
+        with an atomic mkdir, so concurrent pipelines never share a version.
+        """
+        pattern = re.compile(rf"^{re.escape(name)}_v(\d+)\.pkl$")
+        versions = [int(match.group(1)) for match in map(pattern.match, os.listdir(self.root)) if match]
+        version = max(versions, default=0) + 1
+        while True:
+            path = os.path.join(self.root, f"{name}_v{version}.pkl")
+            try:
+                os.mkdir(path)
+                return version, path
+            except FileExistsError:
+                version += 1
+
+    def save_model(self, model, model_path, extra_files=None):
+        """
+        Serialize model once in MLflow's sklearn format into model_path, plus extra files.
+
+        extra_files maps a file name to a function writing that file at a given path;
+        use the serving sidecar names of MODEL_FILE (e.g. transform_path(MODEL_FILE))
+        so the scoring API can load the version directory. A manifest tying the extra
+        files to the model is stored last and marks the version as complete.
+
+        Returns the sha256 of the model file, its key in the object store.
+        """
+        import mlflow.sklearn
+        staging = tempfile.mkdtemp(dir=self.staging_dir)
+        try:
+            model_dir = os.path.join(staging, 'model')
+            mlflow.sklearn.save_model(model, model_dir)
+            sidecars = []
+            for name, write in (extra_files or {}).items():
+                write(os.path.join(model_dir, name))
+                sidecars.append(os.path.join(model_dir, name))
+            model_file = os.path.join(model_dir, MODEL_FILE)
+            model_sha256 = write_manifest(model_file, sidecars)['model_sha256']
+            manifest = os.path.join(staging, os.path.basename(manifest_path(model_file)))
+            os.replace(manifest_path(model_file), manifest)
+            self.store_directory(model_dir, model_path)
+            self._link(self._store_object(manifest), os.path.join(model_path, os.path.basename(manifest)))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return model_sha256
+
+    def store_directory(self, source_dir, target_dir):
+        """Move every file of source_dir into the object store and hard-link it into target_dir."""
+        for directory, _, filenames in os.walk(source_dir):
+            relative = os.path.relpath(directory, source_dir)
+            os.makedirs(os.path.join(target_dir, relative), exist_ok=True)
+            for filename in filenames:
+                obj = self._store_object(os.path.join(directory, filename))
+                self._link(obj, os.path.join(target_dir, relative, filename))
+
+    @staticmethod
+    def _link(obj, target):
+        try:
+            os.link(obj, target)
+        except OSError:
+            shutil.copy2(obj, target)  # Filesystems without hard links
+
+    def object_path(self, sha256):
+        """Location in the object store of the file with the given sha256."""
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def _store_object(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        obj = self.object_path(digest.hexdigest())
+        if os.path.exists(obj):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            os.replace(path, obj)
+        return obj
+
+    def submit(self, task, *args, **kwargs):
+        """Run task(*args, **kwargs) on the background thread after earlier tasks."""
+        with self._lock:
+            if self._thread is None:
+                atexit.register(self.flush)  # Pending logging still completes if the caller never flushes
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='artifact-logger', daemon=True)
+                self._thread.start()
+        self._queue.put((task, args, kwargs))
+
+    def _run(self):
+        while True:
+            task, args, kwargs = self._queue.get()
+            try:
+                task(*args, **kwargs)
+            except Exception as e:
+                logg.error(f"Artifact logging task failed: {e}")
+                self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait for every submitted task; raise if any of them failed."""
+        self._queue.join()
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise RuntimeError(f"{len(errors)} artifact logging task(s) failed") from errors[0]
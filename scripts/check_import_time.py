@@ -0,0 +1,78 @@
+import os
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points and the directory each one is started from
+ENTRY_POINTS = [
+    ('scripts.data_preprocessor', ROOT),
+    ('scripts.model_development_scripts', ROOT),
+    ('scripts.model_explainablity_script', ROOT),
+    ('scripts.incremental_training', ROOT),
+    ('scripts.evaluation', ROOT),
+    ('serve_model', os.path.join(ROOT, 'app_API')),
+    ('batch_score', os.path.join(ROOT, 'app_API')),
+    ('callbacks', os.path.join(ROOT, 'dashboard')),
+]
+
+
+def measure(module, cwd):
+    """
+    Import module in a fresh interpreter with -X importtime.
+
+    Returns (total_us, {top-level package: self_us}); raises RuntimeError when the import fails.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join([cwd, ROOT])},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us = None
+    by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        by_package[name.strip().split('.')[0]] += int(self_us)
+        if name.strip() == module and not name.startswith('  '):
+            total_us = int(cumulative_us)
+    return total_us, by_package
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import-time cost of each entry point with python -X importtime.")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Fail if any entry point takes longer to import (an entry point that fails to import always fails)")
+    parser.add_argument('--top', type=int, default=3, help="Heaviest packages listed per entry point")
+    args = parser.parse_args(argv)
+
+    over_budget, failed = [], []
+    print(f"{'entry point':<40} {'import ms':>10}  heaviest packages")
+    for module, cwd in ENTRY_POINTS:
+        try:
+            total_us, by_package = measure(module, cwd)
+        except RuntimeError as e:
+            print(f"{module:<40} {'failed':>10}  {e}")
+            failed.append(module)  # A broken entry point never passes the startup check
+            continue
+        heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        summary = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in heaviest)
+        print(f"{module:<40} {total_us / 1000:>10.1f}  {summary}")
+        if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+            over_budget.append(module)
+
+    if failed:
+        print(f"Failed to import: {', '.join(failed)}")
+    if over_budget:
+        print(f"Over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+    return 1 if failed or over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,22 @@
 import numpy as np
 import pandas as pd
 import logging
-from sklearn.preprocessing import MinMaxScaler
+from scripts import schema
+from scripts.feature_transform import FeatureTransform
+from scripts.entity_graph import EntityGraph
+from scripts.stage_runner import _code_version
 
 # Set up basic logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logg = logging.getLogger(__name__)
 
 class DataPreprocessor:
-    def __init__(self, file_path1, file_path2, file_path3):
+    def __init__(self, file_path1, file_path2, file_path3, profiler=None):
         """
         Initialize the DataPreprocessor with file paths for three datasets.
+
+        profiler: Optional StageProfiler; when given, every public method is timed and
+            its memory and output rows recorded.
         """
         self.file_path1 = file_path1
         self.file_path2 = file_path2
@@ -18,15 +24,18 @@ class DataPreprocessor:
         self.data = None
         self.data1 = None
         self.data2 = None
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
 
     def load_data(self):
         """
-        Load data from the provided file paths into Pandas DataFrames.
+        Load data from the provided file paths into Pandas DataFrames using the compact schema.
         """
         try:
-            self.data = pd.read_csv(self.file_path1)
-            self.data1 = pd.read_csv(self.file_path2)
-            self.data2 = pd.read_csv(self.file_path3)
+            self.data = schema.read_csv(self.file_path1)
+            self.data1 = schema.read_csv(self.file_path2)
+            self.data2 = schema.read_csv(self.file_path3)
             logg.info("Data loaded successfully!")
             return self.data, self.data1, self.data2
         
@@ -67,8 +76,9 @@ class DataPreprocessor:
         """
         logg.info("Normalizing data...")
         if all(col in data.columns for col in columns):
+            from sklearn.preprocessing import MinMaxScaler
             scaler = MinMaxScaler()
-            data[columns] = scaler.fit_transform(data[columns])
+            data[columns] = scaler.fit_transform(data[columns]).astype(schema.FLOAT_DTYPE)
             logg.info("Dataset normalized successfully using Min-Max scaling.")
             return data
         else:
@@ -76,6 +86,51 @@ class DataPreprocessor:
             logg.error(f"Missing columns for normalization: {missing_cols}")
             return data
         
+    def merge_ip_country(self, fraud_data, ip_data):
+        """
+        Map each transaction's IP address to its country with a sorted range join.
+        """
+        logg.info("Merging IP address ranges with country data...")
+        fraud_data = fraud_data.dropna(subset=['ip_address']).copy()
+        # The one place IPs are truncated: Fraud_Data stores them as fractional floats and the
+        # range join compares whole addresses (schema.downcast keeps ip_address lossless)
+        fraud_data['ip_int'] = fraud_data['ip_address'].astype(np.int64)
+        ip_data = ip_data.astype({'lower_bound_ip_address': np.int64, 'upper_bound_ip_address': np.int64})
+
+        merged_data = pd.merge_asof(
+            fraud_data.sort_values('ip_int'),
+            ip_data.sort_values('lower_bound_ip_address'),
+            left_on='ip_int',
+            right_on='lower_bound_ip_address',
+            direction='backward'
+        )
+
+        # Keep only rows whose IP falls inside the matched range
+        merged_data = merged_data[(merged_data['ip_int'] >= merged_data['lower_bound_ip_address']) &
+                                  (merged_data['ip_int'] <= merged_data['upper_bound_ip_address'])]
+        merged_data = merged_data.drop(columns=['ip_address', 'lower_bound_ip_address', 'upper_bound_ip_address'])
+
+        logg.info("IP addresses mapped to countries.")
+        return schema.downcast(merged_data)
+
+    def run_cached_pipeline(self, runner, target='class'):
+        """
+        Run load -> IP merge -> feature engineering -> transaction features -> feature transform
+        through a StageRunner, so stages whose inputs, parameters and code are unchanged are skipped.
+
+        Returns (transform, model_data) as build_model_data does; pass the transform to
+        ModelPipeline so the model is saved with the preprocessing it was trained on.
+        """
+        fraud_data = runner.run('load_fraud_data', schema.read_csv, self.file_path1)
+        ip_data = runner.run('load_ip_data', schema.read_csv, self.file_path2)
+        merged_data = runner.run('merge_ip_country', self.merge_ip_country, fraud_data, ip_data)
+        merged_data = runner.run('feature_engineering', self.feature_engineering, merged_data)
+        merged_data = runner.run('transaction_features', self.calculate_transaction_features, merged_data)
+        # The stage output is the fitted transform itself, so changes to FeatureTransform invalidate it too
+        version = _code_version(self.build_model_data) + _code_version(FeatureTransform)
+        return runner.run('build_model_data', self.build_model_data, merged_data,
+                          params={'target': target}, version=version)
+
     def feature_engineering(self, merged_data):
         """
         Perform feature engineering on the dataset by creating new features based on existing columns.
@@ -88,6 +143,7 @@ class DataPreprocessor:
         # Create 'hour_of_day' and 'day_of_week' features
         merged_data['hour_of_day'] = merged_data['purchase_time'].dt.hour
         merged_data['day_of_week'] = merged_data['purchase_time'].dt.dayofweek  # 0=Monday, 6=Sunday
+        merged_data = schema.downcast(merged_data)
 
         logg.info("Feature engineering completed: added 'hour_of_day' and 'day_of_week'.")
         
@@ -127,8 +183,44 @@ class DataPreprocessor:
         df['average_velocity'].fillna(overall_mean_velocity, inplace=True)
 
         logg.info("Transaction features calculated and merged.")
-        return df
+        return schema.downcast(df)
+
+
+    def add_entity_graph_features(self, df, graph=None, ip_column='ip_int', freq='D'):
+        """
+        Add shared-entity features from the user-device-IP linkage graph.
+
+        Adds cluster_size (users connected through shared devices/IPs), users_per_device,
+        users_per_ip and the cluster's fraud count/rate. Features are point-in-time:
+        transactions are added in purchase_time buckets of freq, and each one only sees
+        links and labels of earlier buckets plus its own links, so calling this before
+        split_data leaks neither later links nor test labels into training features.
+        Pass the graph returned by a previous call to add later transactions
+        incrementally; returns (df, graph).
 
+        The columns are not part of FeatureTransform: serving them would need a live
+        graph updated with every scored transaction, which FraudModel does not keep.
+        """
+        logg.info("Building entity graph features...")
+        if graph is None:
+            graph = EntityGraph(ip_column=ip_column)
+        df = pd.concat([df, graph.fit_transform(df, freq=freq)], axis=1)
+        logg.info("Entity graph features added.")
+        return df, graph
+
+    def build_model_data(self, merged_data, target='class'):
+        """
+        Fit the shared FeatureTransform on merged data and return it with the model-ready dataset.
+
+        The transform replaces the ad-hoc normalize/encode/frequency-encoding steps and
+        should be passed to ModelPipeline so it is saved next to the trained model.
+        """
+        logg.info("Fitting feature transform...")
+        transform = FeatureTransform().fit(merged_data)
+        model_data = transform.transform(merged_data)
+        model_data[target] = merged_data[target].to_numpy()
+        logg.info(f"Feature transform fitted with {len(transform.feature_names_)} features.")
+        return transform, model_data
 
     def encode_categorical_data(self, df, cat_columns):
         """
@@ -137,13 +229,9 @@ class DataPreprocessor:
         logg.info("Encoding categorical data...")
         
         if all(col in df.columns for col in cat_columns):
-            encoded_data = pd.get_dummies(df, columns=cat_columns, drop_first=True)
+            encoded_data = pd.get_dummies(df, columns=cat_columns, drop_first=True, dtype=schema.ONE_HOT_DTYPE)
             logg.info("Categorical data encoded successfully!")
 
-            # Convert only the newly created one-hot encoded columns to integers
-            one_hot_cols = [col for col in encoded_data.columns if col.startswith(tuple(cat_columns))]
-            encoded_data[one_hot_cols] = encoded_data[one_hot_cols].astype(int)
-            
             return encoded_data
         else:
             missing_cols = [col for col in cat_columns if col not in df.columns]
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import numpy as np
+
+
+class SurrogateModel:
+    """
+    Compact imitation of a full model with an uncertain band around the decision threshold.
+
+    Scores outside [low, high] are decided by the surrogate alone; scores inside
+    the band are sent to the full model. Saved next to the serving model and
+    applied by FraudModel.
+
+    For single rows the boosted regressor's shallow trees are compiled into plain
+    node lists and walked directly: a few hundred list lookups instead of the
+    per-call input validation that dominates sklearn's predict on one row.
+    """
+
+    def __init__(self, regressor, low, high, threshold=0.5):
+        self.regressor = regressor
+        self.low = low
+        self.high = high
+        self.threshold = threshold
+        self.base = float(np.ravel(regressor.init_.predict(np.zeros((1, regressor.n_features_in_))))[0])
+        self.learning_rate = regressor.learning_rate
+        self.trees = []
+        for estimator in regressor.estimators_[:, 0]:
+            tree = estimator.tree_
+            self.trees.append((tree.feature.tolist(), tree.threshold.tolist(), tree.children_left.tolist(),
+                               tree.children_right.tolist(), tree.value[:, 0, 0].tolist()))
+
+    def raw_score(self, X):
+        """Predicted log-odds of the full model, identical to regressor.predict(X)."""
+        if len(X) == 1:
+            # Trees compare float32 features against their thresholds, as sklearn does
+            X = np.asarray(X, dtype=np.float32)
+            row = X[0].tolist()
+            total = 0.0
+            for feature, threshold, left, right, value in self.trees:
+                node = 0
+                while left[node] != -1:
+                    node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+                total += value[node]
+            return np.array([self.base + self.learning_rate * total])
+
+        return self.regressor.predict(X)  # Batches: sklearn's compiled traversal is faster
+
+    def score(self, X):
+        """Imitated fraud probability."""
+        return 1.0 / (1.0 + np.exp(-self.raw_score(X)))
+
+    def decide(self, scores):
+        """Return (decisions, uncertain): surrogate decisions and the mask of rows needing the full model."""
+        scores = np.asarray(scores)
+        uncertain = (scores >= self.low) & (scores <= self.high)
+        return (scores >= self.threshold).astype(np.int64), uncertain
+
+
+class Distiller:
+    """
+    Distill a tree ensemble into a shallow boosted-tree surrogate with a fallback band.
+
+    The surrogate is trained to reproduce the teacher's probabilities (as log-odds)
+    on the training features, so it learns the teacher's decision surface rather
+    than the labels. The band is then set on calibration rows the teacher was not
+    trained on (its scores on its own training rows are memorized and overconfident):
+    it is the narrowest interval around the threshold outside which the surrogate's
+    decisions agree with the teacher's at target_agreement or better.
+    """
+
+    def __init__(self, n_estimators=50, max_depth=3, learning_rate=0.2, target_agreement=0.999,
+                 min_margin=0.05, threshold=0.5, random_state=42):
+        """
+        n_estimators / max_depth / learning_rate: Size of the surrogate's boosted trees.
+        target_agreement: Required agreement with the teacher on rows the surrogate decides alone.
+        min_margin: Smallest half-width of the band, so borderline scores always reach the teacher.
+        threshold: Decision threshold on fraud probability used by both models.
+        """
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.learning_rate = learning_rate
+        self.target_agreement = target_agreement
+        self.min_margin = min_margin
+        self.threshold = threshold
+        self.random_state = random_state
+
+    def fit(self, teacher, X, X_calibration):
+        """Train a surrogate of teacher on features X, set its band on X_calibration and return it."""
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        teacher_scores = np.clip(teacher.predict_proba(X)[:, 1], 1e-4, 1 - 1e-4)
+        regressor = GradientBoostingRegressor(n_estimators=self.n_estimators, max_depth=self.max_depth,
+                                              learning_rate=self.learning_rate, random_state=self.random_state)
+        regressor.fit(X, np.log(teacher_scores / (1 - teacher_scores)))
+
+        surrogate = SurrogateModel(regressor, self.threshold, self.threshold, self.threshold)
+        teacher_decisions = teacher.predict_proba(X_calibration)[:, 1] >= self.threshold
+        surrogate.low, surrogate.high = self._band(surrogate.score(X_calibration), teacher_decisions)
+        logging.info(f"Surrogate distilled; uncertain band [{surrogate.low:.3f}, {surrogate.high:.3f}].")
+        return surrogate
+
+    def _band(self, scores, teacher_decisions):
+        """Narrowest symmetric band around the threshold meeting target_agreement outside it."""
+        if not len(scores):
+            return 0.0, 1.0
+        distance = np.abs(scores - self.threshold)
+        disagree = (scores >= self.threshold) != teacher_decisions
+        # Rows ordered from most to least confident; keeping the first k decides them by surrogate
+        order = np.argsort(-distance, kind='mergesort')
+        disagreements = np.cumsum(disagree[order])
+        kept = np.arange(1, len(order) + 1)
+        meets = disagreements <= (1 - self.target_agreement) * kept
+        if not meets.any():
+            return 0.0, 1.0
+        # Largest confident prefix that still meets the target; rows at least that confident skip the teacher
+        k = int(np.nonzero(meets)[0].max())
+        margin = float(distance[order[k]])
+        if k + 1 < len(order):
+            margin = (margin + float(distance[order[k + 1]])) / 2
+        else:
+            margin = 0.0
+        margin = max(margin, self.min_margin)
+        return max(0.0, self.threshold - margin), min(1.0, self.threshold + margin)
+
+    def report(self, teacher, surrogate, X, n_single=200):
+        """
+        Agreement and speed of the surrogate-with-fallback against the teacher on X.
+
+        Batch timings score all of X; single-row timings score n_single rows one at a
+        time, as the API does.
+        """
+        start = time.perf_counter()
+        teacher_decisions = teacher.predict_proba(X)[:, 1] >= self.threshold
+        teacher_batch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decisions, uncertain = surrogate.decide(surrogate.score(X))
+        if uncertain.any():
+            decisions[uncertain] = teacher.predict_proba(_rows(X, uncertain))[:, 1] >= self.threshold
+        hybrid_batch = time.perf_counter() - start
+
+        rows = [_rows(X, slice(i, i + 1)) for i in range(min(n_single, len(X)))]
+        start = time.perf_counter()
+        for row in rows:
+            teacher.predict_proba(row)
+        teacher_single = (time.perf_counter() - start) / max(len(rows), 1)
+        start = time.perf_counter()
+        for row in rows:
+            row_decision, row_uncertain = surrogate.decide(surrogate.score(row))
+            if row_uncertain[0]:
+                teacher.predict_proba(row)
+        hybrid_single = (time.perf_counter() - start) / max(len(rows), 1)
+
+        return {
+            'surrogate_agreement': float(np.mean(decisions == teacher_decisions)),
+            'surrogate_fallback_rate': float(np.mean(uncertain)),
+            'surrogate_band_low': surrogate.low,
+            'surrogate_band_high': surrogate.high,
+            'surrogate_batch_speedup': teacher_batch / max(hybrid_batch, 1e-9),
+            'surrogate_single_row_ms': hybrid_single * 1000,
+            'teacher_single_row_ms': teacher_single * 1000,
+            'surrogate_single_row_speedup': teacher_single / max(hybrid_single, 1e-9),
+        }
+
+
+def _rows(X, index):
+    """Select rows of a DataFrame or array by mask or slice."""
+    return X.iloc[index] if hasattr(X, 'iloc') else X[index]
+
+
+def surrogate_path(model_path):
+    """Location of the surrogate saved alongside a serving model artifact."""
+    return f"{os.path.splitext(model_path)[0]}_surrogate.joblib"
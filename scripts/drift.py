@@ -0,0 +1,221 @@
+import os
+import json
+import zlib
+import bisect
+import threading
+import numpy as np
+import pandas as pd
+
+# Raw payload fields monitored for drift
+NUMERIC_FEATURES = ['purchase_value', 'age', 'hour_of_day']
+CATEGORICAL_FEATURES = ['browser', 'source', 'country']
+
+OTHER = '__other__'
+
+
+def hour_of_day(purchase_time):
+    """Hour of a purchase_time value, without a full timestamp parse for 'YYYY-MM-DD HH:MM:SS' strings."""
+    if isinstance(purchase_time, str) and len(purchase_time) >= 13 and purchase_time[11:13].isdigit():
+        return int(purchase_time[11:13])
+    return pd.Timestamp(purchase_time).hour
+
+
+def psi(expected, actual, eps=1e-4):
+    """Population stability index between two distributions over the same bins."""
+    expected = np.clip(np.asarray(expected, dtype=np.float64), eps, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def kl_divergence(expected, actual, eps=1e-4):
+    """KL(actual || expected) over the same bins."""
+    expected = np.clip(np.asarray(expected, dtype=np.float64), eps, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), eps, None)
+    return float(np.sum(actual * np.log(actual / expected)))
+
+
+class DriftBaseline:
+    """
+    Training-time distribution of the monitored inputs.
+
+    Numeric features are summarized by quantile bin edges and the share of rows
+    per bin (hour uses its 24 natural bins); categorical features by the shares of
+    their most frequent categories plus one bucket for the rest. Saved as JSON next
+    to the serving model.
+    """
+
+    def __init__(self, numeric, categorical, n_rows):
+        self.numeric = numeric          # feature -> {'edges': [...], 'shares': [...]}
+        self.categorical = categorical  # feature -> {'categories': [...], 'shares': [...]}
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, df, n_bins=10, max_categories=50):
+        """Build a baseline from raw training transactions (before scaling and encoding)."""
+        numeric = {}
+        for feature in NUMERIC_FEATURES:
+            if feature == 'hour_of_day':
+                values = pd.to_datetime(df['purchase_time']).dt.hour.to_numpy(dtype=np.float64)
+                edges = np.arange(1, 24, dtype=np.float64)
+            else:
+                values = df[feature].to_numpy(dtype=np.float64)
+                edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+            numeric[feature] = {'edges': edges.tolist(), 'shares': (counts / len(values)).tolist()}
+
+        categorical = {}
+        for feature in CATEGORICAL_FEATURES:
+            shares = df[feature].astype(str).value_counts(normalize=True)
+            top = shares.iloc[:max_categories]
+            categorical[feature] = {'categories': top.index.tolist() + [OTHER],
+                                    'shares': top.tolist() + [max(0.0, 1.0 - float(top.sum()))]}
+        return cls(numeric, categorical, len(df))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'numeric': self.numeric, 'categorical': self.categorical, 'n_rows': self.n_rows}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        return cls(state['numeric'], state['categorical'], state['n_rows'])
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency sketch; estimates never undercount.
+
+    Columns come from CRC32 rather than the interpreter's per-process salted
+    hash(), so tables built in different processes line up and can be added.
+    """
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        # Plain lists: scalar updates on the request path are much cheaper than numpy indexing
+        self.table = [[0] * width for _ in range(depth)]
+
+    def _columns(self, key):
+        # Double hashing from two seeded CRC32s of the key
+        data = key.encode()
+        h1, h2 = zlib.crc32(data), zlib.crc32(data, 0x9E3779B9) | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        for row, column in zip(self.table, self._columns(key)):
+            row[column] += count
+
+    def estimate(self, key):
+        return min(row[column] for row, column in zip(self.table, self._columns(key)))
+
+    def merge(self, table):
+        """Add another sketch's table of the same width and depth."""
+        if len(table) != self.depth or any(len(row) != self.width for row in table):
+            raise ValueError("Count-min sketches of different sizes cannot be merged.")
+        for row, other in zip(self.table, table):
+            for column, count in enumerate(other):
+                if count:
+                    row[column] += count
+
+
+class DriftMonitor:
+    """
+    Streaming comparison of live inputs against a DriftBaseline in constant memory.
+
+    Each observed transaction increments one histogram bin per numeric feature and
+    one count-min sketch per categorical feature, so the per-request cost is a few
+    binary searches and hash updates regardless of traffic volume. report() turns
+    the sketches into distributions over the baseline's bins and computes PSI and
+    KL divergence per feature. All counts are additive, so monitors of separate
+    processes are combined with snapshot() and merge().
+    """
+
+    def __init__(self, baseline, sketch_width=1024, sketch_depth=4):
+        self.baseline = baseline
+        self._edges = {feature: spec['edges'] for feature, spec in baseline.numeric.items()}
+        self.histograms = {feature: [0] * (len(edges) + 1) for feature, edges in self._edges.items()}
+        self.sketches = {feature: CountMinSketch(sketch_width, sketch_depth) for feature in baseline.categorical}
+        self.n_observed = 0
+        self._lock = threading.Lock()
+
+    def update(self, record):
+        """Add one raw transaction; fields that are missing or unparsable are skipped."""
+        with self._lock:
+            self.n_observed += 1
+            for feature, edges in self._edges.items():
+                try:
+                    if feature == 'hour_of_day':
+                        value = hour_of_day(record['purchase_time'])
+                    else:
+                        value = float(record[feature])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.histograms[feature][bisect.bisect_right(edges, value)] += 1
+            for feature, sketch in self.sketches.items():
+                if feature in record:
+                    sketch.add(str(record[feature]))
+
+    def snapshot(self):
+        """All counts as plain lists, e.g. for writing to a file another process merges."""
+        with self._lock:
+            return {
+                'n_observed': self.n_observed,
+                'histograms': {feature: list(counts) for feature, counts in self.histograms.items()},
+                'sketches': {feature: [list(row) for row in sketch.table] for feature, sketch in self.sketches.items()},
+            }
+
+    def merge(self, snapshot):
+        """Add the counts of a snapshot() taken from a monitor with the same baseline and sketch size."""
+        with self._lock:
+            self.n_observed += snapshot['n_observed']
+            for feature, counts in snapshot['histograms'].items():
+                histogram = self.histograms[feature]
+                for i, count in enumerate(counts):
+                    histogram[i] += count
+            for feature, table in snapshot['sketches'].items():
+                self.sketches[feature].merge(table)
+
+    def report(self):
+        """PSI and KL divergence per feature, with the expected and observed shares per bin."""
+        with self._lock:
+            histograms = {feature: list(counts) for feature, counts in self.histograms.items()}
+            n_observed = self.n_observed
+            categorical = {}
+            for feature, spec in self.baseline.categorical.items():
+                sketch = self.sketches[feature]
+                counts = [sketch.estimate(category) for category in spec['categories'][:-1]]
+                counts.append(max(0, n_observed - sum(counts)))  # Everything else falls in the rest bucket
+                categorical[feature] = counts
+
+        features = {}
+        for feature, counts in histograms.items():
+            features[feature] = self._compare(self.baseline.numeric[feature]['shares'], counts,
+                                              self._bin_labels(self._edges[feature]))
+        for feature, counts in categorical.items():
+            spec = self.baseline.categorical[feature]
+            features[feature] = self._compare(spec['shares'], counts, spec['categories'])
+        return {'n_observed': n_observed, 'baseline_rows': self.baseline.n_rows, 'features': features}
+
+    @staticmethod
+    def _compare(expected, counts, labels):
+        total = sum(counts)
+        actual = [count / total for count in counts] if total else [0.0] * len(counts)
+        return {
+            'psi': psi(expected, actual) if total else None,
+            'kl': kl_divergence(expected, actual) if total else None,
+            'bins': labels,
+            'expected': expected,
+            'actual': actual,
+        }
+
+    @staticmethod
+    def _bin_labels(edges):
+        bounds = ['-inf'] + [f"{edge:g}" for edge in edges] + ['inf']
+        return [f"[{low}, {high})" for low, high in zip(bounds[:-1], bounds[1:])]
+
+
+def drift_path(model_path):
+    """Location of the drift baseline saved alongside a serving model artifact."""
+    return f"{os.path.splitext(model_path)[0]}_drift.json"
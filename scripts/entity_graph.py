@@ -0,0 +1,180 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logg = logging.getLogger(__name__)
+
+ENTITY_TYPES = ['user', 'device', 'ip']
+
+
+class EntityGraph:
+    """
+    User-device-IP linkage graph for detecting shared-entity fraud rings.
+
+    Every user, device_id and IP is a node; each transaction links its user to its
+    device and IP. Connected components are kept as a flattened union-find parent
+    array (every node points at its component's smallest node id), so lookups are
+    a single array index. update() merges components with one connected-components
+    pass over the roots touched by the new, deduplicated edges, so each batch costs
+    time proportional to its own edges plus one relabeling pass over the nodes.
+
+    Memory is O(nodes + distinct user-entity pairs), independent of how many
+    transactions repeat the same links.
+
+    Features are point-in-time: transform() describes each transaction as if only
+    its own links were added to the graph built so far, and fit_transform() walks
+    labeled data in time order, so a transaction never sees links or labels of
+    later ones.
+    """
+
+    def __init__(self, user_column='user_id', device_column='device_id', ip_column='ip_int', target='class',
+                 time_column='purchase_time'):
+        self.columns = {'user': user_column, 'device': device_column, 'ip': ip_column}
+        self.target = target
+        self.time_column = time_column
+        self.keys = {kind: pd.Index([]) for kind in ENTITY_TYPES}     # entity value -> position
+        self.node_ids = {kind: np.empty(0, dtype=np.int64) for kind in ENTITY_TYPES}  # position -> node id
+        self.parent = np.empty(0, dtype=np.int64)
+        self.is_user = np.empty(0, dtype=bool)
+        self.txn_count = np.empty(0, dtype=np.int64)    # per node, transactions of that user
+        self.fraud_count = np.empty(0, dtype=np.int64)  # per node, fraudulent transactions of that user
+        # Distinct (entity, user) links per entity type, packed as entity << 32 | user and kept sorted
+        self.pairs = {'device': np.empty(0, dtype=np.int64), 'ip': np.empty(0, dtype=np.int64)}
+
+    @property
+    def n_nodes(self):
+        return len(self.parent)
+
+    def _node_ids(self, kind, values, add=True):
+        """Map entity values to node ids, registering unseen values as new nodes when add is True."""
+        values = pd.Index(values)
+        positions = self.keys[kind].get_indexer(values)
+        if add and (positions < 0).any():
+            new_values = values[positions < 0].unique()
+            start = self.n_nodes
+            new_ids = np.arange(start, start + len(new_values), dtype=np.int64)
+            self.keys[kind] = self.keys[kind].append(new_values) if len(self.keys[kind]) else new_values
+            self.node_ids[kind] = np.concatenate([self.node_ids[kind], new_ids])
+            self.parent = np.concatenate([self.parent, new_ids])  # New nodes start as their own root
+            self.is_user = np.concatenate([self.is_user, np.full(len(new_values), kind == 'user')])
+            self.txn_count = np.concatenate([self.txn_count, np.zeros(len(new_values), dtype=np.int64)])
+            self.fraud_count = np.concatenate([self.fraud_count, np.zeros(len(new_values), dtype=np.int64)])
+            positions = self.keys[kind].get_indexer(values)
+        ids = np.full(len(values), -1, dtype=np.int64)
+        known = positions >= 0
+        ids[known] = self.node_ids[kind][positions[known]]
+        return ids
+
+    def update(self, df):
+        """Add a batch of transactions (links and, when present, labels) and merge the components it links."""
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        users = self._node_ids('user', df[self.columns['user']].to_numpy())
+        new_edges = []
+        for kind in ('device', 'ip'):
+            entities = self._node_ids(kind, df[self.columns[kind]].to_numpy())
+            packed = np.unique((entities << 32) | users)
+            # Only the batch is sorted; its unseen pairs are inserted into the sorted array in one pass
+            new = packed[~_contains(self.pairs[kind], packed)]
+            self.pairs[kind] = np.insert(self.pairs[kind], np.searchsorted(self.pairs[kind], new), new)
+            new_edges.append(np.column_stack([packed >> 32, packed & 0xFFFFFFFF]))
+
+        np.add.at(self.txn_count, users, 1)
+        if self.target in df.columns:
+            np.add.at(self.fraud_count, users, df[self.target].to_numpy(dtype=np.int64))
+
+        # Only the components the new edges touch take part, each entering as its root
+        edges = self.parent[np.vstack(new_edges)]
+        touched, local = np.unique(edges, return_inverse=True)
+        local = local.reshape(edges.shape)
+        graph = coo_matrix((np.ones(len(local), dtype=np.int8), (local[:, 0], local[:, 1])),
+                           shape=(len(touched), len(touched)))
+        n_components, labels = connected_components(graph, directed=False)
+
+        # Flatten: every node points at the smallest node id of its component
+        roots = np.full(n_components, self.n_nodes, dtype=np.int64)
+        np.minimum.at(roots, labels, touched)
+        relabel = np.arange(self.n_nodes)
+        relabel[touched] = roots[labels]
+        self.parent = relabel[self.parent]
+        logg.info(f"Entity graph updated: {self.n_nodes} nodes.")
+        return self
+
+    def transform(self, df):
+        """
+        Return graph features for each transaction in df as if only its own links were added.
+
+        A transaction joins the clusters of its user, device and IP, so cluster_size,
+        users_per_device/ip and the cluster's fraud history are what they would be right
+        after it arrives. Labels come only from transactions already in the graph, and
+        the graph is left unchanged.
+        """
+        n = self.n_nodes
+        users_per_root = np.bincount(self.parent, weights=self.is_user, minlength=n)
+        txns_per_root = np.bincount(self.parent, weights=self.txn_count, minlength=n)
+        fraud_per_root = np.bincount(self.parent, weights=self.fraud_count, minlength=n)
+
+        users = self._node_ids('user', df[self.columns['user']].to_numpy(), add=False)
+        nodes = {'user': users}
+        features = pd.DataFrame(index=df.index)
+        for kind in ('device', 'ip'):
+            entities = self._node_ids(kind, df[self.columns[kind]].to_numpy(), add=False)
+            nodes[kind] = entities
+            users_per_entity = np.bincount(self.pairs[kind] >> 32, minlength=n)
+            linked = (entities >= 0) & (users >= 0) & _contains(self.pairs[kind], (entities << 32) | users)
+            features[f"users_per_{kind}"] = (_lookup(users_per_entity, entities) + ~linked).astype(np.uint32)
+
+        # Sum over the distinct existing clusters the transaction links together
+        roots = [_lookup(self.parent, ids, default=-1) for ids in nodes.values()]
+        distinct = [roots[0] >= 0,
+                    (roots[1] >= 0) & (roots[1] != roots[0]),
+                    (roots[2] >= 0) & (roots[2] != roots[0]) & (roots[2] != roots[1])]
+        cluster = {'users': (users < 0).astype(np.float64), 'txns': np.zeros(len(df)), 'fraud': np.zeros(len(df))}
+        for root, keep in zip(roots, distinct):
+            root = np.where(keep, root, -1)
+            cluster['users'] += _lookup(users_per_root, root)
+            cluster['txns'] += _lookup(txns_per_root, root)
+            cluster['fraud'] += _lookup(fraud_per_root, root)
+
+        features['cluster_size'] = cluster['users'].astype(np.uint32)
+        features['cluster_fraud_count'] = cluster['fraud'].astype(np.uint32)
+        features['cluster_fraud_rate'] = np.divide(cluster['fraud'], cluster['txns'], out=np.zeros(len(df)),
+                                                   where=cluster['txns'] > 0).astype(np.float32)
+        return features[['cluster_size', 'users_per_device', 'users_per_ip', 'cluster_fraud_count', 'cluster_fraud_rate']]
+
+    def fit_transform(self, df, freq='D'):
+        """
+        Add labeled transactions in time order and return each one's point-in-time features.
+
+        Transactions are grouped into time_column buckets of freq; each bucket is
+        transformed against the graph of all earlier buckets and then added, so rows
+        see neither links nor labels of later buckets (nor of their own bucket, apart
+        from their own links). A finer freq is more exact and costs one update per bucket.
+        """
+        times = pd.to_datetime(df[self.time_column], errors='coerce')
+        if times.isna().any():
+            raise ValueError(f"{int(times.isna().sum())} rows have no valid '{self.time_column}'.")
+        buckets = times.dt.floor(freq).to_numpy()
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.flatnonzero(np.diff(buckets[order]).astype(np.int64)) + 1
+        parts = []
+        for rows in np.split(order, bounds):
+            batch = df.iloc[rows]
+            parts.append(self.transform(batch))
+            self.update(batch)
+        # Back to df's row order (positional, so duplicate index labels are fine)
+        return pd.concat(parts).iloc[np.argsort(order, kind='stable')]
+
+
+def _lookup(values, ids, default=0):
+    """values[ids] where ids >= 0, default for the -1 of unknown entities."""
+    if not len(values):
+        return np.full(len(ids), default)
+    return np.where(ids >= 0, values[np.maximum(ids, 0)], default)
+
+
+def _contains(sorted_values, values):
+    """Membership of values in a sorted array, by binary search."""
+    positions = np.minimum(np.searchsorted(sorted_values, values), max(len(sorted_values) - 1, 0))
+    return sorted_values[positions] == values if len(sorted_values) else np.zeros(len(values), dtype=bool)
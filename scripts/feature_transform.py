@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Numeric columns scaled to [0, 1] with the min/max seen at fit time
+NUMERIC_COLUMNS = ['purchase_value', 'age']
+
+# Categorical columns one-hot encoded with the first (alphabetical) category dropped
+ONE_HOT_COLUMNS = ['source', 'browser', 'sex']
+
+
+class FeatureTransform:
+    """
+    Fitted preprocessing shared by training and serving.
+
+    Reproduces the training feature recipe: Min-Max scaling of purchase_value and
+    age, hour/day-of-week from purchase_time, one-hot encoding with drop_first,
+    and frequency encoding of country followed by Min-Max scaling. It is fitted
+    once by the pipeline and saved next to the model, so serving applies exactly
+    the same transform instead of re-creating an approximation of it.
+    """
+
+    def __init__(self, numeric_columns=NUMERIC_COLUMNS, one_hot_columns=ONE_HOT_COLUMNS):
+        self.numeric_columns = list(numeric_columns)
+        self.one_hot_columns = list(one_hot_columns)
+        self.feature_names_ = None
+
+    def fit(self, df):
+        """Learn scaling ranges, categories and country frequencies from raw merged data."""
+        self.min_ = {col: float(df[col].min()) for col in self.numeric_columns}
+        self.range_ = {col: float(df[col].max()) - self.min_[col] or 1.0 for col in self.numeric_columns}
+
+        # get_dummies orders categories alphabetically; drop_first removes the first one
+        self.categories_ = {col: sorted(df[col].dropna().astype(str).unique()) for col in self.one_hot_columns}
+
+        frequency = df['country'].astype(str).value_counts()
+        low, high = float(frequency.min()), float(frequency.max())
+        self.countries_ = frequency.index.tolist()
+        self.country_values_ = ((frequency.to_numpy(dtype=np.float64) - low) / ((high - low) or 1.0)).astype(np.float32)
+        self.unknown_country_ = np.float32((0 - low) / ((high - low) or 1.0))
+
+        self.feature_names_ = self.numeric_columns + ['hour_of_day', 'day_of_week']
+        for col in self.one_hot_columns:
+            self.feature_names_ += [f"{col}_{category}" for category in self.categories_[col][1:]]
+        self.feature_names_.append('country_encoded')
+
+        # Lookup tables for the single-row path
+        self._index = {name: i for i, name in enumerate(self.feature_names_)}
+        self._country_lookup = dict(zip(self.countries_, self.country_values_.tolist()))
+        return self
+
+    def transform(self, df):
+        """Vectorized transform of a batch of raw transactions into model features."""
+        out = {}
+        for col in self.numeric_columns:
+            out[col] = ((df[col].to_numpy(dtype=np.float64) - self.min_[col]) / self.range_[col]).astype(np.float32)
+
+        # Rows without a valid time are rejected, as transform_one rejects them, rather than scored as hour 0 / Monday
+        purchase_time = pd.to_datetime(df['purchase_time'], errors='coerce')
+        invalid = purchase_time.isna()
+        if invalid.any():
+            raise ValueError(f"{int(invalid.sum())} rows have an invalid purchase_time, "
+                             f"e.g. {df['purchase_time'][invalid].iloc[0]!r} at index {df.index[invalid][0]!r}.")
+        out['hour_of_day'] = purchase_time.dt.hour.to_numpy(dtype=np.uint8)
+        out['day_of_week'] = purchase_time.dt.dayofweek.to_numpy(dtype=np.uint8)
+
+        for col in self.one_hot_columns:
+            categories = self.categories_[col]
+            codes = pd.Categorical(df[col].astype(str), categories=categories).codes
+            for i, category in enumerate(categories[1:], start=1):
+                out[f"{col}_{category}"] = (codes == i).astype(np.uint8)
+
+        codes = pd.Categorical(df['country'].astype(str), categories=self.countries_).codes
+        lookup = np.append(self.country_values_, self.unknown_country_)  # Code -1 (unknown) maps to the last slot
+        out['country_encoded'] = lookup[codes]
+
+        return pd.DataFrame(out, index=df.index)[self.feature_names_]
+
+    def transform_one(self, record, purchase_time=None):
+        """
+        Fast path for a single transaction dict; returns a 1 x n_features float32 array.
+
+        purchase_time: record['purchase_time'] already parsed with parse_purchase_time, for
+            callers that time the parse on its own.
+        """
+        row = np.zeros((1, len(self.feature_names_)), dtype=np.float32)
+        index = self._index
+        for col in self.numeric_columns:
+            row[0, index[col]] = (float(record[col]) - self.min_[col]) / self.range_[col]
+
+        if purchase_time is None:
+            purchase_time = parse_purchase_time(record['purchase_time'])
+        row[0, index['hour_of_day']] = purchase_time.hour
+        row[0, index['day_of_week']] = purchase_time.dayofweek
+
+        for col in self.one_hot_columns:
+            position = index.get(f"{col}_{record.get(col)}")
+            if position is not None:
+                row[0, position] = 1
+
+        row[0, index['country_encoded']] = self._country_lookup.get(str(record.get('country')), self.unknown_country_)
+        return row
+
+
+def parse_purchase_time(value):
+    """Parse one purchase_time; raises ValueError for values that are missing or not a time."""
+    try:
+        purchase_time = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        purchase_time = pd.NaT
+    if pd.isna(purchase_time):
+        raise ValueError(f"Invalid purchase_time {value!r}.")
+    return purchase_time
+
+
+def transform_path(model_path):
+    """Location of the transform saved alongside a serving model artifact."""
+    return f"{os.path.splitext(model_path)[0]}_transform.joblib"
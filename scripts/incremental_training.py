@@ -0,0 +1,161 @@
+import os
+import joblib
+import logging
+import numpy as np
+import pandas as pd
+from scripts import schema
+
+# Target column for each dataset type, as in ModelPipeline
+TARGETS = {'creditcard': 'Class', 'fraud': 'class'}
+
+
+class IncrementalTrainer:
+    """
+    Update a model with only the transactions labeled since its last update.
+
+    The model and a watermark of what has been consumed are checkpointed between
+    runs, so a daily refresh reads and trains on the new batch alone:
+
+    - models with partial_fit take one partial_fit pass. For the linear family use
+      SGDClassifier(loss='log_loss'), logistic regression trained by stochastic
+      gradient descent, so each batch moves the coefficients from where they were;
+    - tree ensembles (RandomForest, GradientBoosting, ...) get n_new_trees extra
+      trees fitted on the new batch via warm_start, keeping the existing ones.
+
+    LogisticRegression is rejected: warm_start only seeds its solver, which still
+    converges to the optimum of the new batch alone and discards the model's history.
+    """
+
+    def __init__(self, model, model_name, dataset_type, state_dir="../saved_models/incremental",
+                 n_new_trees=10, label_time_column=None, key_columns=None, apply_smote=True):
+        """
+        model: Unfitted estimator used when no checkpoint exists yet; it must support
+            partial_fit or be a warm-startable tree ensemble.
+        model_name: Name used for the checkpoint file.
+        dataset_type: 'creditcard' or 'fraud', selecting the target column.
+        state_dir: Directory holding the checkpoints.
+        n_new_trees: Trees added per update for tree ensembles.
+        label_time_column: Column holding when each row's label was recorded (a datetime, a
+            number or an ISO string), not when the transaction happened: fraud labels arrive
+            late, so a purchase-time watermark would skip transactions labeled after the last
+            run but purchased before it. Rows labeled after the stored watermark are new, as
+            are rows labeled exactly at it whose key_columns were not consumed yet. When None,
+            the labeled file is treated as append-only and rows past the stored row count are new.
+        key_columns: Columns identifying a row (e.g. ['user_id', 'purchase_time']); required
+            with label_time_column. Only the keys of rows labeled at the watermark are kept.
+            Like label_time_column they are bookkeeping only and never used as features.
+        apply_smote: Balance each batch with SMOTE before training, as the full pipeline does.
+        """
+        if dataset_type not in TARGETS:
+            raise ValueError("Invalid dataset_type! Must be 'creditcard' or 'fraud'")
+        if label_time_column is not None and not key_columns:
+            raise ValueError("key_columns are required with label_time_column, to tell rows labeled "
+                             "at the same time apart.")
+        params = model.get_params()
+        if not hasattr(model, 'partial_fit') and not ('n_estimators' in params and 'warm_start' in params):
+            raise ValueError(f"{type(model).__name__} cannot be updated incrementally; use a model with "
+                             "partial_fit (e.g. SGDClassifier(loss='log_loss') instead of LogisticRegression) "
+                             "or a warm-startable tree ensemble.")
+        self.model_name = model_name
+        self.dataset_type = dataset_type
+        self.target = TARGETS[dataset_type]
+        self.n_new_trees = n_new_trees
+        self.label_time_column = label_time_column
+        self.key_columns = list(key_columns or [])
+        self.apply_smote = apply_smote
+        self.state_path = os.path.join(state_dir, f"{dataset_type}_{model_name.replace(' ', '_')}.joblib")
+        os.makedirs(state_dir, exist_ok=True)
+
+        if os.path.exists(self.state_path):
+            self.state = joblib.load(self.state_path)
+            logging.info(f"Loaded {model_name} checkpoint after {self.state['n_updates']} updates.")
+        else:
+            self.state = {'model': model, 'rows_consumed': 0, 'watermark': None, 'boundary_keys': [],
+                          'feature_names': None, 'n_updates': 0}
+
+    @property
+    def model(self):
+        return self.state['model']
+
+    def load_new_batch(self, path):
+        """Read only the rows labeled since the last update."""
+        if self.label_time_column is None:
+            # Append-only file: rows before the stored count are skipped by count, not kept as an index set
+            skip = self.state['rows_consumed']
+            if skip:
+                header = pd.read_csv(path, nrows=0).columns
+                batch = schema.read_csv(path, skiprows=skip + 1, header=None, names=header)
+            else:
+                batch = schema.read_csv(path)
+        else:
+            batch = schema.read_csv(path)
+            watermark = self.state['watermark']
+            if watermark is not None:
+                label_time = batch[self.label_time_column]
+                consumed = pd.MultiIndex.from_frame(batch[self.key_columns]).isin(self.state['boundary_keys'])
+                batch = batch[(label_time > watermark) | ((label_time == watermark) & ~consumed)]
+        logging.info(f"{len(batch)} newly labeled rows for {self.model_name}.")
+        return batch
+
+    def update(self, path):
+        """Train on the new batch from path, checkpoint the result and return the model."""
+        batch = self.load_new_batch(path)
+        if batch.empty:
+            logging.info(f"No new labeled data; {self.model_name} unchanged.")
+            return self.model
+
+        bookkeeping = [self.label_time_column] + self.key_columns if self.label_time_column else []
+        X = batch.drop(columns=[self.target] + bookkeeping)
+        y = batch[self.target]
+        if self.state['feature_names'] is None:
+            self.state['feature_names'] = X.columns.tolist()
+        X = X[self.state['feature_names']]
+
+        X, y = self._balance(X, y)
+        self._fit_increment(X, y)
+
+        self.state['n_updates'] += 1
+        self.state['rows_consumed'] += len(batch)
+        if self.label_time_column is not None:
+            self._advance_watermark(batch)
+        self.save()
+        logging.info(f"{self.model_name} updated with {len(batch)} rows (update {self.state['n_updates']}).")
+        return self.model
+
+    def _advance_watermark(self, batch):
+        """Move the watermark to the batch's latest label time and remember the keys labeled at it."""
+        label_time = batch[self.label_time_column]
+        latest = label_time.max()
+        keys = list(batch.loc[label_time == latest, self.key_columns].itertuples(index=False, name=None))
+        if latest == self.state['watermark']:
+            keys += self.state['boundary_keys']
+        self.state['watermark'] = latest
+        self.state['boundary_keys'] = keys
+
+    def _balance(self, X, y):
+        """Apply SMOTE to the batch when it has enough minority samples."""
+        minority = y.value_counts().min() if y.nunique() > 1 else 0
+        if not self.apply_smote or minority < 2:
+            return X, y
+        from imblearn.over_sampling import SMOTE
+        return SMOTE(random_state=42, k_neighbors=min(5, minority - 1)).fit_resample(X, y)
+
+    def _fit_increment(self, X, y):
+        model = self.model
+        first_update = self.state['n_updates'] == 0
+        params = model.get_params()
+
+        if hasattr(model, 'partial_fit'):
+            model.partial_fit(X, y, classes=np.array([0, 1]))
+        elif 'n_estimators' in params and 'warm_start' in params:
+            if not first_update:
+                model.set_params(warm_start=True, n_estimators=model.n_estimators + self.n_new_trees)
+            model.fit(X, y)
+        else:
+            raise ValueError(f"{type(model).__name__} does not support incremental training.")
+
+    def save(self):
+        """Checkpoint the model and watermark atomically."""
+        tmp_path = f"{self.state_path}.tmp"
+        joblib.dump(self.state, tmp_path)
+        os.replace(tmp_path, self.state_path)
@@ -1,45 +1,88 @@
 import os
+import time
+import joblib
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from imblearn.over_sampling import SMOTE
-import mlflow
-import mlflow.sklearn
 import logging
+from scripts import schema
+from scripts.feature_transform import transform_path
+from scripts.drift import drift_path
+from scripts.distillation import surrogate_path
+from scripts.serving_manifest import write_manifest
+from scripts.artifact_store import ArtifactManager, MODEL_FILE
+from scripts.evaluation import ThresholdEvaluator
+
+# mlflow, imblearn and the sklearn estimators are imported inside the methods that use
+# them, and logging/MLflow are configured by the first ModelPipeline, so importing this
+# module stays cheap and free of side effects.
 
-# Create log directory if not exists
 log_dir = "../logs"
-os.makedirs(log_dir, exist_ok=True)
 
-# Set up logging to log both to a file and console
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(f"{log_dir}/pipeline.log"),
-        logging.StreamHandler()
-    ]
-)
+# MLflow tracking URI, overridable through the standard MLFLOW_TRACKING_URI variable
+DEFAULT_TRACKING_URI = "file:///E:/Kiffya_10_acc/Week%208-9/Fraud-Detection/mlruns"
+
+_configured = False
+
 
-# Set MLflow tracking URI to the root directory
-mlflow.set_tracking_uri("file:///E:/Kiffya_10_acc/Week%208-9/Fraud-Detection/mlruns")
+def setup_pipeline_environment():
+    """Create the log directory, set up file and console logging and point MLflow at the tracking store."""
+    global _configured
+    if _configured:
+        return
+    import mlflow
+
+    # Create log directory if not exists
+    os.makedirs(log_dir, exist_ok=True)
+
+    # Set up logging to log both to a file and console
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(f"{log_dir}/pipeline.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    # Set MLflow tracking URI to the root directory
+    mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI))
+    _configured = True
 
 
 class ModelPipeline:
     """Class to handle data loading, splitting, model training, evaluation, and logging."""
 
-    def __init__(self, dataset_type, path):
+    def __init__(self, dataset_type, path, stage_runner=None, feature_transform=None, evaluator=None,
+                 drift_baseline=None, profiler=None, distiller=None, artifacts=None):
         """
         Initialize the pipeline with dataset type and file path.
         
         dataset_type: A string ('creditcard' or 'fraud') to indicate dataset type.
         path: File path for the dataset.
+        stage_runner: Optional StageRunner; when given, loading, splitting and SMOTE
+            are cached and skipped on reruns with unchanged inputs.
+        feature_transform: Optional fitted FeatureTransform that produced the dataset;
+            it is saved with every logged model so serving applies the same preprocessing.
+        evaluator: ThresholdEvaluator used for threshold sweeps and bootstrap intervals;
+            defaults to one with the standard costs.
+        drift_baseline: Optional DriftBaseline of the raw training inputs; it is saved
+            with every logged and exported model so serving can monitor input drift.
+        profiler: Optional StageProfiler; when given, every pipeline step is timed and
+            profiled, and the numbers are logged with each model's MLflow run.
+        distiller: Optional Distiller; when given, tree ensembles get a low-latency
+            surrogate whose agreement and speedup are logged and which is saved with the model.
+        artifacts: ArtifactManager storing models and logging them to MLflow in the
+            background; defaults to one rooted at ../saved_models.
         """
         self.dataset_type = dataset_type
         self.path = path
+        self.stage_runner = stage_runner
+        self.feature_transform = feature_transform
+        self.evaluator = evaluator or ThresholdEvaluator()
+        self.drift_baseline = drift_baseline
+        self.distiller = distiller
+        self.surrogates = {}
+        self.artifacts = artifacts or ArtifactManager("../saved_models")
+        self.threshold_results = {}
         self.data = None
         self.target = None
         self.X_train = None
@@ -55,19 +98,26 @@ class ModelPipeline:
         else:
             raise ValueError("Invalid dataset_type! Must be 'creditcard' or 'fraud'")
 
-        # Set the experiment for MLflow
+        # Set the experiment for MLflow; runs are started on the artifact thread, so keep its id
+        import mlflow
+        setup_pipeline_environment()
         mlflow.set_experiment(self.experiment_name)
+        self.experiment_id = mlflow.get_experiment_by_name(self.experiment_name).experiment_id
+
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
 
     def load_data(self):
         """Load data based on the dataset type."""
         if self.dataset_type == 'creditcard':
             logging.info(f"Loading credit card data from {self.path}...")
-            self.data = pd.read_csv(self.path)
+            self.data = self._run_stage('load_data', schema.read_csv, self.path)
             self.target = 'Class'  # Target column for creditcard dataset
 
         elif self.dataset_type == 'fraud':
             logging.info(f"Loading fraud data from {self.path}...")
-            self.data = pd.read_csv(self.path)
+            self.data = self._run_stage('load_data', schema.read_csv, self.path)
             self.target = 'class'  # Target column for fraud dataset
 
         else:
@@ -78,10 +128,9 @@ class ModelPipeline:
     def split_data(self, test_size=0.2, random_state=42):
         """Split the loaded data into training and test sets."""
         if self.data is not None:
-            X = self.data.drop(columns=[self.target])
-            y = self.data[self.target]
-            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-                X, y, test_size=test_size, random_state=random_state
+            self.X_train, self.X_test, self.y_train, self.y_test = self._run_stage(
+                'split_data', _split, self.data,
+                params={'target': self.target, 'test_size': test_size, 'random_state': random_state}
             )
             logging.info("Data has been split into train and test sets.")
         else:
@@ -91,12 +140,20 @@ class ModelPipeline:
         """Apply SMOTE to balance the training data."""
         if self.X_train is not None and self.y_train is not None:
             logging.info("Applying SMOTE to the training data...")
-            smote = SMOTE(random_state=42)
-            self.X_train, self.y_train = smote.fit_resample(self.X_train, self.y_train)
+            self.X_train, self.y_train = self._run_stage(
+                'apply_smote', _smote, self.X_train, self.y_train, params={'random_state': 42}
+            )
             logging.info("SMOTE applied to training data. Classes have been balanced.")
         else:
             raise ValueError("Training data is not available. Please split the data first.")
         
+    def _run_stage(self, name, func, *args, params=None):
+        """Run a data stage through the stage runner when one is configured."""
+        params = params or {}
+        if self.stage_runner is None:
+            return func(*args, **params)
+        return self.stage_runner.run(f"{self.dataset_type}_{name}", func, *args, params=params)
+
     def train_model(self, model, model_name):
         """Train the model with the training data."""
         logging.info(f"Training {model_name} on {self.dataset_type} dataset...")
@@ -105,50 +162,137 @@ class ModelPipeline:
 
     def evaluate_model(self, model, model_name):
         """Evaluate the model using the test data and return the classification report."""
+        from sklearn.metrics import classification_report
         logging.info(f"Evaluating {model_name} on {self.dataset_type} dataset...")
-        y_pred = model.predict(self.X_test)
-        
+
+        # Score once; the default 0.5 cutoff and the threshold sweep both come from these probabilities
+        if hasattr(model, 'predict_proba'):
+            y_scores = model.predict_proba(self.X_test)[:, 1]
+            y_pred = (y_scores > 0.5).astype(int)
+        else:
+            y_scores = None
+            y_pred = model.predict(self.X_test)
+
         report = classification_report(self.y_test, y_pred, output_dict=True)
-        logging.info(f"{model_name} evaluation report:\n{classification_report(self.y_test, y_pred)}")
+        logging.info(f"{model_name} evaluation report:\n{pd.DataFrame(report).T.round(4)}")
+
+        if y_scores is not None:
+            summary, curves = self.evaluator.evaluate(self.y_test, y_scores)
+            self.threshold_results[model_name] = (summary, curves)
+            logging.info(f"{model_name} PR-AUC {summary['pr_auc']:.4f}, best F1 {summary['best_f1']:.4f} "
+                         f"at threshold {summary['best_f1_threshold']:.3f}.")
         return report
 
+    def distill_model(self, model, model_name):
+        """
+        Distill a surrogate of model on the training data.
+
+        Half of the test set calibrates the surrogate's fallback band and the other
+        half measures its agreement and speedup.
+        """
+        logging.info(f"Distilling a surrogate of {model_name}...")
+        half = len(self.X_test) // 2
+        surrogate = self.distiller.fit(model, self.X_train, self.X_test.iloc[:half])
+        surrogate_report = self.distiller.report(model, surrogate, self.X_test.iloc[half:])
+        self.surrogates[model_name] = (surrogate, surrogate_report)
+        logging.info(f"{model_name} surrogate: {surrogate_report['surrogate_agreement']:.2%} agreement, "
+                     f"{surrogate_report['surrogate_fallback_rate']:.2%} fallback, "
+                     f"{surrogate_report['surrogate_single_row_speedup']:.1f}x single-row speedup.")
+        return surrogate, surrogate_report
+
     def log_model(self, model, model_name, report):
-        """Log the model, performance metrics, and save the model artifact to MLflow."""
-        logging.info(f"Logging {model_name} to MLflow...")
-
-        # Create the model save path
-        model_dir = "../saved_models"
-        os.makedirs(model_dir, exist_ok=True)
-
-        # Determine the next version number
-        version = 1
-        model_path = os.path.join(model_dir, f"{self.dataset_type}_{model_name}_v{version}.pkl")
-        while os.path.exists(model_path):
-            version += 1
-            model_path = os.path.join(model_dir, f"{self.dataset_type}_{model_name}_v{version}.pkl")
-
-        # Save the model locally
-        mlflow.sklearn.save_model(model, model_path)
-        
-        # Start MLflow run
-        with mlflow.start_run():
-            # Log model parameters if available
-            if hasattr(model, 'get_params'):
-                mlflow.log_params(model.get_params())
-
-            # Log classification metrics
-            mlflow.log_metrics({
-                "precision": report['1']['precision'],
-                "recall": report['1']['recall'],
-                "f1-score": report['1']['f1-score'],
-                "accuracy": report['accuracy']
+        """
+        Save the model once to the content-addressed store and log its metrics and store location to MLflow.
+
+        Serialization and MLflow logging run on the artifact manager's background
+        thread, so training of the next model starts immediately; call
+        self.artifacts.flush() (run_pipeline does) to wait for them.
+        """
+        logging.info(f"Queueing {model_name} for saving and MLflow logging...")
+        version, model_path = self.artifacts.claim_version(f"{self.dataset_type}_{model_name}")
+
+        # Snapshot everything the background task logs; later stages keep mutating pipeline state.
+        # Extra files take the sidecar names the scoring API looks for next to the MLflow model file
+        extra_files = {}
+        if self.feature_transform is not None:
+            extra_files[transform_path(MODEL_FILE)] = lambda path, obj=self.feature_transform: joblib.dump(obj, path)
+        if self.drift_baseline is not None:
+            extra_files[drift_path(MODEL_FILE)] = self.drift_baseline.save
+        if model_name in self.surrogates:
+            extra_files[surrogate_path(MODEL_FILE)] = lambda path, obj=self.surrogates[model_name][0]: joblib.dump(obj, path)
+        params = model.get_params() if hasattr(model, 'get_params') else None
+        metrics = {
+            "precision": report['1']['precision'],
+            "recall": report['1']['recall'],
+            "f1-score": report['1']['f1-score'],
+            "accuracy": report['accuracy']
+        }
+        if model_name in self.surrogates:
+            metrics.update(self.surrogates[model_name][1])
+        threshold_results = self.threshold_results.get(model_name)
+        profile = self.profiler.summary() if self.profiler is not None else None
+
+        self.artifacts.submit(self._save_and_log, model, model_name, version, model_path, extra_files,
+                              params, metrics, threshold_results, profile)
+
+    def _save_and_log(self, model, model_name, version, model_path, extra_files, params, metrics,
+                      threshold_results, profile):
+        """Background part of log_model: one serialization, then a single MLflow run."""
+        import mlflow
+        start = time.perf_counter()
+        model_sha256 = self.artifacts.save_model(model, model_path, extra_files)
+
+        with mlflow.start_run(experiment_id=self.experiment_id):
+            if params is not None:
+                mlflow.log_params(params)
+            mlflow.log_metrics(metrics)
+
+            # Log threshold sweep metrics, confidence intervals and compact curves
+            if threshold_results is not None:
+                self.evaluator.log_to_mlflow(*threshold_results, model_name)
+
+            # Log the stage profile recorded when the model was queued
+            if profile is not None:
+                self.profiler.log_to_mlflow(profile)
+
+            # The model stays in the content-addressed store; the run records where it is
+            # (mlflow.sklearn.load_model(model_store_path) loads it) instead of a second copy
+            mlflow.set_tags({
+                'model_name': model_name,
+                'model_version': version,
+                'model_store_path': os.path.abspath(model_path),
+                'model_sha256': model_sha256,
+                'model_object': os.path.abspath(self.artifacts.object_path(model_sha256)),
             })
-            
-            # Log the saved model to MLflow
-            mlflow.sklearn.log_model(model, f"{self.dataset_type}_{model_name}_model")
-            mlflow.log_artifact(model_path)  # Save the model artifact for future use
-            
-            logging.info(f"{model_name} has been logged and saved in MLflow as version {version}.")
+
+        logging.info(f"{model_name} has been saved as version {version} and logged in MLflow "
+                     f"({time.perf_counter() - start:.1f}s in the background).")
+
+    def export_for_serving(self, model, model_path, model_name=None):
+        """
+        Write a model and its fitted feature transform where the scoring API loads them.
+
+        The sidecars (transform, drift baseline, surrogate) are recorded with the
+        model's sha256 in a manifest, and FraudModel only loads sidecars listed for the
+        exact model it read; sidecars this export does not write are removed.
+        """
+        # The model lands last, with one rename, so a watching API never loads it before its manifest
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        surrogate = self.surrogates[model_name][0] if model_name in self.surrogates else None
+        sidecars = [(transform_path(model_path), self.feature_transform, joblib.dump),
+                    (drift_path(model_path), self.drift_baseline, lambda baseline, path: baseline.save(path)),
+                    (surrogate_path(model_path), surrogate, joblib.dump)]
+        written = []
+        for path, obj, write in sidecars:
+            if obj is not None:
+                write(obj, path)
+                written.append(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        write_manifest(model_path, written, model_file=tmp_path)
+        os.replace(tmp_path, model_path)
+        logging.info(f"Model exported for serving to {model_path}.")
 
     def run_pipeline(self):
         """Run the entire pipeline from loading data to training and logging models."""
@@ -159,6 +303,9 @@ class ModelPipeline:
         self.split_data()
         self.apply_smote()
         # Step 3: Train and evaluate multiple models
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.tree import DecisionTreeClassifier
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
         models = [
             (LogisticRegression(), 'Logistic Regression'),
             (DecisionTreeClassifier(), 'Decision Tree'),
@@ -169,4 +316,27 @@ class ModelPipeline:
         for model, name in models:
             self.train_model(model, name)
             report = self.evaluate_model(model, name)
+            # Only ensembles are worth distilling; a single tree or linear model is already cheap
+            if self.distiller is not None and hasattr(model, 'estimators_'):
+                self.distill_model(model, name)
             self.log_model(model, name, report)
+
+        # Wait for background saving and MLflow logging before the pipeline returns
+        self.artifacts.flush()
+
+        if self.profiler is not None:
+            self.profiler.log_summary()
+
+
+def _split(data, target, test_size, random_state):
+    """Split a dataset into train and test features and labels."""
+    from sklearn.model_selection import train_test_split
+    X = data.drop(columns=[target])
+    y = data[target]
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+
+def _smote(X, y, random_state):
+    """Oversample the minority class with SMOTE."""
+    from imblearn.over_sampling import SMOTE
+    return SMOTE(random_state=random_state).fit_resample(X, y)
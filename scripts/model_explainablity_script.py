@@ -1,13 +1,11 @@
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-import shap
-import lime
-import lime.lime_tabular
-import matplotlib.pyplot as plt
+from scripts import schema
+
+# shap, lime and sklearn are imported inside the methods that need them, so importing
+# this module (e.g. to load data only) does not pay for them.
 
 class FraudDetectionInterpretability:
     def __init__(self, data_path):
+        from sklearn.ensemble import RandomForestClassifier
         self.data_path = data_path
         self.model = RandomForestClassifier(random_state=42)
         self.X_train, self.X_test, self.y_train, self.y_test = None, None, None, None
@@ -15,7 +13,8 @@ class FraudDetectionInterpretability:
 
     def load_and_split_data(self, test_size=0.2):
         """Load the dataset, split into features and target, and divide into training and testing sets."""
-        data = pd.read_csv(self.data_path)
+        from sklearn.model_selection import train_test_split
+        data = schema.read_csv(self.data_path)
         X = data.drop(columns=['class'])  # Features
         y = data['class']  # Target variable
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y, test_size=test_size, random_state=42)
@@ -26,6 +25,7 @@ class FraudDetectionInterpretability:
 
     def shap_summary_plot(self):
         """Generate SHAP summary plot to visualize feature importance."""
+        import shap
         if not self.shap_explainer:
             self.shap_explainer = shap.Explainer(self.model,self.X_train)
         
@@ -38,6 +38,7 @@ class FraudDetectionInterpretability:
 
     def shap_force_plot(self, shap_values, instance_index=0):
         """Generate SHAP force plot for a specific instance to explain the individual prediction."""
+        import shap
         shap.initjs()
         return shap.force_plot(
             self.shap_explainer.expected_value[1], 
@@ -47,6 +48,7 @@ class FraudDetectionInterpretability:
 
     def lime_explanation(self, instance_index=0):
         """Generate LIME explanation for a single test instance to interpret individual prediction."""
+        import lime.lime_tabular
         lime_explainer = lime.lime_tabular.LimeTabularExplainer(
             training_data=self.X_train.values, 
             feature_names=self.X_train.columns.tolist(),
@@ -0,0 +1,207 @@
+import io
+import os
+import sys
+import time
+import inspect
+import logging
+import tempfile
+import functools
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource  # Peak RSS; not available on Windows
+except ImportError:
+    resource = None
+
+logg = logging.getLogger(__name__)
+
+
+def _peak_rss_mb():
+    """Process peak resident set size so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _count_rows(result):
+    """Rows in a stage's output: the first DataFrame/Series/array found in the result."""
+    if isinstance(result, (tuple, list)):
+        for item in result:
+            rows = _count_rows(item)
+            if rows is not None:
+                return rows
+        return None
+    if hasattr(result, 'shape') and len(getattr(result, 'shape', ())) > 0:
+        return int(result.shape[0])
+    return None
+
+
+class StageProfiler:
+    """
+    Opt-in per-stage profiling for DataPreprocessor and ModelPipeline.
+
+    instrument() wraps every public method of an object so each call records wall
+    time, CPU time, peak traced Python/numpy memory (tracemalloc), process peak
+    RSS and the number of rows it returned. Nested calls (e.g. run_pipeline ->
+    train_model) are recorded separately with their depth, and peak memory is
+    carried up so an outer stage's peak includes its inner stages. Chosen stages
+    can additionally be run under cProfile and dumped to profile_dir.
+    """
+
+    def __init__(self, trace_memory=True, cprofile_stages=(), profile_dir="../logs/profiles"):
+        """
+        trace_memory: Track peak allocations with tracemalloc (slows allocation-heavy stages).
+        cprofile_stages: Method names (e.g. 'apply_smote') or 'Class.method' stages to run under cProfile.
+        profile_dir: Where .prof dumps of cProfile'd stages are written.
+        """
+        self.trace_memory = trace_memory
+        self.cprofile_stages = set(cprofile_stages)
+        self.profile_dir = profile_dir
+        self.records = []
+        self.profile_paths = []
+        self._peaks = []  # Running traced peak of each open stage, innermost last
+
+    def instrument(self, obj):
+        """Wrap every public method of obj in place with profile(); returns obj."""
+        for name, method in inspect.getmembers(obj, inspect.ismethod):
+            if not name.startswith('_'):
+                setattr(obj, name, self.wrap(f"{type(obj).__name__}.{name}", method))
+        return obj
+
+    def wrap(self, stage, func):
+        """Return func profiled as the named stage; the original stays reachable via __wrapped__."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            record = {}
+            with self.profile(stage, record):
+                result = func(*args, **kwargs)
+            record['rows'] = _count_rows(result)
+            return result
+        return wrapper
+
+    def profile(self, stage, record=None):
+        """Context manager recording one run of a stage; record receives extra fields such as rows."""
+        return _StageTimer(self, stage, {} if record is None else record)
+
+    def summary(self):
+        """One row per finished stage: calls, total wall/CPU seconds, peak memory and rows of the last call."""
+        finished = [record for record in self.records if 'wall_s' in record]
+        if not finished:
+            return pd.DataFrame(columns=['stage', 'depth', 'calls', 'wall_s', 'cpu_s',
+                                         'peak_traced_mb', 'peak_rss_mb', 'rows'])
+        records = pd.DataFrame(finished)
+        summary = records.groupby('stage', sort=False).agg(
+            depth=('depth', 'min'),
+            calls=('stage', 'size'),
+            wall_s=('wall_s', 'sum'),
+            cpu_s=('cpu_s', 'sum'),
+            peak_traced_mb=('peak_traced_mb', 'max'),
+            peak_rss_mb=('peak_rss_mb', 'max'),
+            rows=('rows', 'last'),
+        ).reset_index()
+        return summary.round(3)
+
+    def log_summary(self):
+        """Log the summary table, inner stages indented under the stage that called them."""
+        summary = self.summary()
+        summary['stage'] = ['  ' * depth + stage for stage, depth in zip(summary['stage'], summary['depth'])]
+        logg.info(f"Stage profile:\n{summary.drop(columns=['depth']).to_string(index=False)}")
+        return summary
+
+    def log_to_mlflow(self, summary=None):
+        """
+        Log per-stage metrics, the summary CSV and any cProfile dumps to the active MLflow run.
+
+        summary: A summary() taken earlier, e.g. when logging happens in the background.
+        """
+        import mlflow
+        if summary is None:
+            summary = self.summary()
+        metrics = {}
+        for row in summary.itertuples(index=False):
+            for field in ['wall_s', 'cpu_s', 'peak_traced_mb', 'peak_rss_mb', 'rows']:
+                value = getattr(row, field)
+                if pd.notna(value):
+                    metrics[f"profile.{row.stage}.{field}"] = float(value)
+        mlflow.log_metrics(metrics)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'stage_profile.csv')
+            summary.to_csv(path, index=False)
+            mlflow.log_artifact(path, artifact_path='profiling')
+        for path in list(self.profile_paths):
+            mlflow.log_artifact(path, artifact_path='profiling')
+        logg.info("Stage profile logged to MLflow.")
+
+
+class _StageTimer:
+    def __init__(self, profiler, stage, record):
+        self.profiler = profiler
+        self.stage = stage
+        self.record = record
+        self.cprofile = None
+
+    def __enter__(self):
+        profiler = self.profiler
+        if profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # Hand the peak so far to the enclosing stage before resetting it for this one
+            if profiler._peaks:
+                profiler._peaks[-1] = max(profiler._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.start_traced = tracemalloc.get_traced_memory()[0]
+        profiler._peaks.append(0)
+        # Registered on entry so the summary lists stages in call order, callers first
+        profiler.records.append(self.record)
+
+        method = self.stage.rsplit('.', 1)[-1]
+        if self.stage in profiler.cprofile_stages or method in profiler.cprofile_stages:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        profiler = self.profiler
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self._dump()
+
+        peak = profiler._peaks.pop()
+        peak_traced_mb = None
+        if profiler.trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            peak_traced_mb = max(0, peak - self.start_traced) / 1024 ** 2
+            if profiler._peaks:
+                profiler._peaks[-1] = max(profiler._peaks[-1], peak)
+
+        self.record.update({
+            'stage': self.stage,
+            'depth': len(profiler._peaks),
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'peak_traced_mb': peak_traced_mb,
+            'peak_rss_mb': _peak_rss_mb(),
+            'failed': exc_type is not None,
+        })
+        self.record.setdefault('rows', None)  # Filled in by the wrapper once the call returns
+        logg.info(f"Stage '{self.stage}': {wall:.2f}s wall, {cpu:.2f}s CPU"
+                  + (f", {peak_traced_mb:.1f} MB peak traced" if peak_traced_mb is not None else "") + ".")
+        return False
+
+    def _dump(self):
+        import pstats
+        os.makedirs(self.profiler.profile_dir, exist_ok=True)
+        path = os.path.join(self.profiler.profile_dir, f"{self.stage}-{int(time.time())}.prof")
+        self.cprofile.dump_stats(path)
+        self.profiler.profile_paths.append(path)
+        report = io.StringIO()
+        pstats.Stats(self.cprofile, stream=report).sort_stats('cumulative').print_stats(15)
+        logg.info(f"cProfile of '{self.stage}' written to {path}; top functions:\n{report.getvalue()}")
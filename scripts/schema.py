@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# Low-cardinality string columns, stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['device_id', 'source', 'browser', 'sex', 'country']
+
+# Timestamp columns parsed at load time
+DATETIME_COLUMNS = ['signup_time', 'purchase_time']
+
+# Explicit target dtypes for known columns; anything not listed is downcast generically
+COLUMN_DTYPES = {
+    'user_id': np.uint32,
+    'age': np.uint8,
+    'class': np.uint8,
+    'Class': np.uint8,
+    'purchase_value': np.float32,
+    'ip_address': np.uint32,
+    'ip_int': np.uint32,
+    'lower_bound_ip_address': np.uint32,
+    'upper_bound_ip_address': np.uint32,
+    'hour_of_day': np.uint8,
+    'day_of_week': np.uint8,
+    'transaction_frequency': np.uint32,
+}
+
+# dtype of one-hot encoded indicator columns
+ONE_HOT_DTYPE = np.uint8
+
+# dtype of every other floating point feature
+FLOAT_DTYPE = np.float32
+
+
+def read_csv(path, parse_dates=True, **kwargs):
+    """
+    Read a CSV with the compact schema applied.
+
+    Categorical columns are typed while parsing, so their strings are never
+    materialized as object arrays; everything else is downcast afterwards.
+    Set parse_dates=False to keep timestamp columns as their original strings.
+    """
+    header = pd.read_csv(path, nrows=0, **kwargs).columns
+    dtype = {col: 'category' for col in CATEGORICAL_COLUMNS if col in header}
+    parse_dates = [col for col in DATETIME_COLUMNS if col in header] if parse_dates else False
+    data = pd.read_csv(path, dtype=dtype, parse_dates=parse_dates, **kwargs)
+    return downcast(data)
+
+
+def downcast(df):
+    """
+    Cast a DataFrame to the compact schema in place and return it.
+
+    Known columns get their declared dtype only when every value converts
+    exactly (and are left as they are otherwise); remaining float64 columns
+    become float32 and remaining int64 columns the smallest
+    integer type that holds their range.
+    """
+    for col in df.columns:
+        series = df[col]
+        target = COLUMN_DTYPES.get(col)
+        if col in CATEGORICAL_COLUMNS and series.dtype == object:
+            df[col] = series.astype('category')
+        elif target is not None:
+            # Leave a known column untouched rather than lose precision when it does not fit exactly
+            # (e.g. the fractional ip_address floats of Fraud_Data stay float64 instead of truncating)
+            if pd.api.types.is_numeric_dtype(series) and _fits(series, target):
+                df[col] = series.astype(target)
+        elif series.dtype == np.float64:
+            df[col] = series.astype(FLOAT_DTYPE)
+        elif series.dtype == np.int64 and not series.empty:
+            df[col] = pd.to_numeric(series, downcast='unsigned' if series.min() >= 0 else 'integer')
+    return df
+
+
+def _fits(series, dtype):
+    """Check that a numeric column converts to dtype without NaNs, overflow or dropped fractions."""
+    if np.issubdtype(dtype, np.floating):
+        return True
+    if series.isna().any():
+        return False
+    if series.empty:
+        return True
+    info = np.iinfo(dtype)
+    if series.min() < info.min or series.max() > info.max:
+        return False
+    return not pd.api.types.is_float_dtype(series) or bool((series % 1 == 0).all())
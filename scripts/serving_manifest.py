@@ -0,0 +1,67 @@
+import os
+import json
+import hashlib
+
+
+def manifest_path(model_path):
+    """Location of the manifest listing the files exported with a serving model artifact."""
+    return f"{os.path.splitext(model_path)[0]}_manifest.json"
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return stream_sha256(f)
+
+
+def stream_sha256(f):
+    """sha256 of a binary file object read from its current position to the end."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(1 << 20), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(model_path, sidecars, model_file=None):
+    """
+    Record the sha256 of a serving model and of each sidecar file exported with it.
+
+    sidecars: Paths of the sidecar files (transform, drift baseline, surrogate) next to model_path.
+    model_file: Where the model's bytes are now, when they are moved to model_path afterwards.
+
+    Returns the manifest.
+    """
+    manifest = {
+        'model_sha256': file_sha256(model_file or model_path),
+        'sidecars': {os.path.basename(path): file_sha256(path) for path in sidecars},
+    }
+    path = manifest_path(model_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def verified_sidecars(model_path, model_sha256):
+    """
+    Paths of the sidecar files exported together with the model whose bytes hash to model_sha256.
+
+    A model without a manifest gets no sidecars, so files left over from another
+    model are never picked up. Raises ValueError when the manifest or one of its
+    files belongs to a different export, e.g. one still being written.
+    """
+    path = manifest_path(model_path)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest['model_sha256'] != model_sha256:
+        raise ValueError(f"{path} was written for a different model than {model_path}.")
+    directory = os.path.dirname(model_path)
+    sidecars = set()
+    for name, sha256 in manifest['sidecars'].items():
+        sidecar = os.path.join(directory, name)
+        if not os.path.exists(sidecar) or file_sha256(sidecar) != sha256:
+            raise ValueError(f"{sidecar} does not match the manifest of {model_path}.")
+        sidecars.add(sidecar)
+    return sidecars
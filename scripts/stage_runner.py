@@ -0,0 +1,135 @@
+import os
+import time
+import pickle
+import hashlib
+import inspect
+import logging
+import numpy as np
+import pandas as pd
+
+logg = logging.getLogger(__name__)
+
+
+class StageRunner:
+    """
+    Run pipeline stages through a local content-addressed cache.
+
+    Each stage is keyed by a fingerprint of its name, the source code of the
+    function it runs, its parameters and its inputs. When the fingerprint is
+    already cached the stored output is returned and the stage is skipped, so a
+    change to one stage only re-runs that stage and the ones after it.
+    """
+
+    def __init__(self, cache_dir="../cache/stages", max_bytes=5 * 1024 ** 3, enabled=True):
+        """
+        cache_dir: Directory holding one pickle per cached stage output.
+        max_bytes: Upper bound on the cache size; least recently used outputs are evicted first.
+        enabled: When False every stage runs and nothing is cached.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def run(self, name, func, *args, params=None, version=None, **kwargs):
+        """
+        Run func(*args, **kwargs, **params) as the named stage, or load its cached output.
+
+        args/kwargs are data inputs and are fingerprinted by content; params are
+        small configuration values. version overrides the code fingerprint, e.g.
+        when func depends on helpers whose changes should also invalidate it.
+        """
+        params = params or {}
+        if not self.enabled:
+            return func(*args, **kwargs, **params)
+
+        key = self.fingerprint(name, func, args, kwargs, params, version)
+        path = os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+        if os.path.exists(path):
+            logg.info(f"Stage '{name}' unchanged, loading cached output ({key[:12]}).")
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(path)  # Mark as recently used for eviction
+            return result
+
+        logg.info(f"Running stage '{name}' ({key[:12]})...")
+        start = time.perf_counter()
+        result = func(*args, **kwargs, **params)
+        logg.info(f"Stage '{name}' finished in {time.perf_counter() - start:.2f}s.")
+
+        # Write to a temporary file first so an interrupted run never leaves a truncated entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+        return result
+
+    def fingerprint(self, name, func, args, kwargs, params, version=None):
+        """Compute the cache key of a stage invocation."""
+        digest = hashlib.sha256()
+        digest.update(name.encode())
+        digest.update((version or _code_version(func)).encode())
+        for value in args:
+            _update(digest, value)
+        for key in sorted(kwargs):
+            digest.update(key.encode())
+            _update(digest, kwargs[key])
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+
+    def evict(self):
+        """Delete least recently used outputs until the cache fits in max_bytes."""
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            logg.info(f"Evicted cached stage output {os.path.basename(path)}.")
+
+    def clear(self):
+        """Remove every cached stage output."""
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+
+def _code_version(func):
+    """Fingerprint the code of a stage function by its source, falling back to its bytecode."""
+    func = getattr(func, '__func__', func)
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, '__code__', None)
+        source = code.co_code.hex() if code is not None else repr(func)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _update(digest, value):
+    """Feed one stage input into the fingerprint."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(repr(value.dtypes.tolist() if isinstance(value, pd.DataFrame) else value.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, str) and os.path.isfile(value):
+        # Files are identified by path, size and modification time rather than a full read
+        stat = os.stat(value)
+        digest.update(f"{os.path.abspath(value)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    else:
+        digest.update(repr(value).encode())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The API modules import each other as top-level modules (they run from app_API/),
+# and the shared code is imported as the scripts package from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in [REPO_ROOT, os.path.join(REPO_ROOT, 'app_API')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
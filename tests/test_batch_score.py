@@ -0,0 +1,89 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import batch_score
+from scripts.feature_transform import FeatureTransform, transform_path
+from scripts.serving_manifest import write_manifest
+
+
+@pytest.fixture
+def scoring_job(tmp_path):
+    """A small model with its fitted transform, and a CSV of raw transactions to score."""
+    rng = np.random.default_rng(0)
+    n = 1000
+    transactions = pd.DataFrame({
+        'user_id': np.arange(n),
+        'purchase_time': (pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 10 ** 7, n), unit='s'))
+        .astype(str),
+        'purchase_value': rng.integers(5, 150, n),
+        'source': rng.choice(['SEO', 'Ads', 'Direct'], n),
+        'browser': rng.choice(['Chrome', 'IE', 'Safari'], n),
+        'sex': rng.choice(['M', 'F'], n),
+        'age': rng.integers(18, 70, n),
+        'country': rng.choice(['USA', 'UK', 'Canada'], n),
+    })
+    transform = FeatureTransform().fit(transactions)
+    model = RandomForestClassifier(n_estimators=5, random_state=0)
+    model.fit(transform.transform(transactions), rng.integers(0, 2, n))
+
+    model_path = str(tmp_path / 'model.pkl')
+    joblib.dump(model, model_path)
+    joblib.dump(transform, transform_path(model_path))
+    write_manifest(model_path, [transform_path(model_path)])
+    input_path = str(tmp_path / 'transactions.csv')
+    transactions.to_csv(input_path, index=False)
+    return model_path, input_path, tmp_path
+
+
+def test_read_chunks_skips_finished_rows(scoring_job):
+    _, input_path, _ = scoring_job
+    full = pd.read_csv(input_path)
+    resumed = pd.concat(batch_score.read_chunks(input_path, chunksize=300, skip_rows=450))
+    pd.testing.assert_frame_equal(resumed.reset_index(drop=True), full.iloc[450:].reset_index(drop=True))
+
+
+def test_resume_after_interruption_matches_uninterrupted_run(scoring_job, monkeypatch):
+    model_path, input_path, tmp_path = scoring_job
+    expected_path = str(tmp_path / 'expected.csv')
+    batch_score.score_file(model_path, input_path, expected_path, workers=1, chunksize=100,
+                           keep_columns=['user_id'])
+
+    # First attempt dies after a few chunks, with a partially written chunk left behind
+    output_path = str(tmp_path / 'scores.csv')
+    read_chunks = batch_score.read_chunks
+
+    def interrupted(path, chunksize, skip_rows=0):
+        for i, chunk in enumerate(read_chunks(path, chunksize, skip_rows)):
+            if i == 4:
+                raise KeyboardInterrupt
+            yield chunk
+
+    monkeypatch.setattr(batch_score, 'read_chunks', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        batch_score.score_file(model_path, input_path, output_path, workers=1, chunksize=100,
+                               keep_columns=['user_id'])
+    checkpoint = batch_score.Checkpoint(f"{output_path}.checkpoint.json", input_path, output_path)
+    assert 0 < checkpoint.rows_done < 1000
+    with open(output_path, 'a') as f:
+        f.write("123,1,0.5\n124,")
+
+    monkeypatch.setattr(batch_score, 'read_chunks', read_chunks)
+    scored = batch_score.score_file(model_path, input_path, output_path, workers=1, chunksize=100,
+                                    keep_columns=['user_id'])
+    assert scored == 1000 - checkpoint.rows_done
+    with open(output_path) as resumed, open(expected_path) as expected:
+        assert resumed.read() == expected.read()
+
+
+def test_resume_without_the_output_file_fails(scoring_job):
+    model_path, input_path, tmp_path = scoring_job
+    output_path = str(tmp_path / 'scores.csv')
+    checkpoint = batch_score.Checkpoint(f"{output_path}.checkpoint.json", input_path, output_path)
+    checkpoint.save(rows_done=300, output_bytes=4096)
+    with pytest.raises(ValueError, match='remove the checkpoint'):
+        batch_score.score_file(model_path, input_path, output_path, workers=1, chunksize=100)
+    assert not os.path.exists(output_path)
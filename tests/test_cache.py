@@ -0,0 +1,55 @@
+from cache import PredictionCache
+
+
+def test_hit_within_same_version():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    assert cache.get('v1', 'key') is None
+    cache.put('v1', 'key', 1)
+    assert cache.get('v1', 'key') == 1
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_new_version_invalidates_entries():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.get('v1', 'key')
+    cache.put('v1', 'key', 1)
+    assert cache.get('v2', 'key') is None
+    # The old version's entries are gone, even if the old version is asked for again
+    assert cache.get('v1', 'key') is None
+
+
+def test_put_for_swapped_out_version_is_ignored():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.get('v1', 'key')
+    cache.get('v2', 'other')  # Swap happens while a v1 prediction is in flight
+    cache.put('v1', 'key', 1)
+    assert cache.get('v2', 'key') is None
+
+
+def test_expired_and_evicted_entries_miss():
+    cache = PredictionCache(maxsize=2, ttl=0)
+    cache.get('v1', 'a')
+    cache.put('v1', 'a', 1)
+    assert cache.get('v1', 'a') is None
+
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.get('v1', 'a')
+    for key in ['a', 'b', 'c']:
+        cache.put('v1', key, key)
+    assert cache.get('v1', 'a') is None
+    assert cache.get('v1', 'c') == 'c'
+
+
+def test_legacy_feature_key_keeps_a_slot_per_column(tmp_path):
+    import joblib
+    import pandas as pd
+    from sklearn.dummy import DummyClassifier
+    from model import FraudModel
+
+    model_path = str(tmp_path / 'model.pkl')
+    joblib.dump(DummyClassifier().fit(pd.DataFrame({'purchase_value': [1, 2], 'age': [30, 40]}), [0, 1]), model_path)
+    model = FraudModel(model_path)
+    payload = {'purchase_time': '2015-01-02 12:00:00', 'country': 'USA', 'source': 'SEO', 'browser': 'Chrome'}
+    _, by_age = model.feature_key({**payload, 'age': 100})
+    _, by_value = model.feature_key({**payload, 'purchase_value': 100})
+    assert by_age != by_value
@@ -0,0 +1,105 @@
+import json
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from registry import WorkerSnapshots, LiveModel
+from scripts.drift import CountMinSketch, DriftBaseline, DriftMonitor
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        'purchase_time': (pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 86400 * 30, n), unit='s'))
+        .strftime('%Y-%m-%d %H:%M:%S'),
+        'purchase_value': rng.integers(5, 150, n),
+        'age': rng.integers(18, 70, n),
+        'browser': rng.choice(['Chrome', 'IE', 'Safari'], n),
+        'source': rng.choice(['SEO', 'Ads', 'Direct'], n),
+        'country': rng.choice(['USA', 'UK', 'Canada'], n),
+    })
+
+
+def _monitor(baseline, records):
+    monitor = DriftMonitor(baseline)
+    for record in records:
+        monitor.update(record)
+    return monitor
+
+
+def test_count_min_sketch_never_undercounts_and_merges_by_addition():
+    left, right = CountMinSketch(width=16, depth=3), CountMinSketch(width=16, depth=3)
+    keys = [f"key{i}" for i in range(50)]
+    for i, key in enumerate(keys):
+        left.add(key, i)
+        right.add(key)
+    left.merge(right.table)
+    assert all(left.estimate(key) >= i + 1 for i, key in enumerate(keys))
+    with pytest.raises(ValueError):
+        left.merge(CountMinSketch(width=8, depth=3).table)
+
+
+def test_merged_monitors_report_like_one_monitor(transactions):
+    baseline = DriftBaseline.from_frame(transactions)
+    records = transactions.to_dict('records')
+    merged = _monitor(baseline, records[:150])
+    merged.merge(_monitor(baseline, records[150:]).snapshot())
+    report = merged.report()
+    assert report == _monitor(baseline, records).report()
+    assert report['n_observed'] == len(records)
+    # Live traffic drawn from the training data does not drift
+    assert all(feature['psi'] < 0.01 for feature in report['features'].values())
+
+
+def test_report_flags_a_shifted_feature(transactions):
+    baseline = DriftBaseline.from_frame(transactions)
+    shifted = transactions.assign(browser='Opera').to_dict('records')
+    report = _monitor(baseline, shifted).report()
+    assert report['features']['browser']['psi'] > 1
+    assert report['features']['age']['psi'] < 0.01
+
+
+def test_worker_snapshots_merge_workers_of_the_serving_version(transactions, tmp_path):
+    baseline = DriftBaseline.from_frame(transactions)
+    records = transactions.to_dict('records')
+    model = types.SimpleNamespace(version='model.pkl@1', drift_baseline=baseline)
+    live = LiveModel(model)
+    for record in records[:100]:
+        live.drift.update(record)
+
+    other_worker = _monitor(baseline, records[100:300]).snapshot()
+    with open(tmp_path / '1.json', 'w') as f:
+        json.dump({'version': 'model.pkl@1', 'payloads': records[100:140], 'drift': other_worker}, f, default=str)
+    with open(tmp_path / '2.json', 'w') as f:
+        json.dump({'version': 'model.pkl@0', 'payloads': records[140:180], 'drift': other_worker}, f, default=str)
+
+    snapshots = WorkerSnapshots(live, str(tmp_path))
+    report = snapshots.report()
+    assert report['workers'] == 2
+    assert report['n_observed'] == 300
+    assert not os.path.exists(tmp_path / '2.json')  # Snapshot of a previous version
+
+
+def test_worker_snapshots_share_recent_payloads(transactions, tmp_path):
+    records = json.loads(transactions.to_json(orient='records'))
+    worker = LiveModel(types.SimpleNamespace(version='model.pkl@1', drift_baseline=None), sample_size=4)
+    worker.recent_payloads.extend(records[:10])
+    WorkerSnapshots(worker, str(tmp_path)).write()
+    os.replace(tmp_path / f"{os.getpid()}.json", tmp_path / '1.json')  # As if written by another process
+
+    # The master serves no requests; it gets the workers' payloads
+    master = LiveModel(types.SimpleNamespace(version='model.pkl@1', drift_baseline=None), sample_size=4)
+    assert WorkerSnapshots(master, str(tmp_path)).recent_payloads() == records[6:10]
+
+
+def test_swap_to_a_model_without_baseline_stops_drift_reporting(transactions, tmp_path):
+    baseline = DriftBaseline.from_frame(transactions)
+    live = LiveModel(types.SimpleNamespace(version='model.pkl@1', drift_baseline=baseline))
+    live.swap(types.SimpleNamespace(version='model.pkl@2', drift_baseline=None))
+    assert live.drift is None
+    assert WorkerSnapshots(live, str(tmp_path)).report() is None
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from scripts.entity_graph import EntityGraph
+
+
+def _transactions(rows):
+    return pd.DataFrame(rows, columns=['user_id', 'device_id', 'ip_int', 'purchase_time', 'class']).assign(
+        purchase_time=lambda df: pd.to_datetime(df['purchase_time']))
+
+
+TRANSACTIONS = _transactions([
+    (1, 'A', 10, '2015-01-01', 1),
+    (2, 'B', 20, '2015-01-02', 0),
+    (2, 'A', 30, '2015-01-03', 0),  # Links user 2 to user 1 through device A
+    (3, 'C', 30, '2015-01-04', 0),  # Joins them through IP 30
+    (4, 'D', 40, '2015-01-05', 1),
+])
+
+
+def _components(graph):
+    roots = graph.parent[graph.node_ids['user']]
+    return {user: root for user, root in zip(graph.keys['user'], roots)}
+
+
+def _groups(graph):
+    groups = {}
+    for user, root in _components(graph).items():
+        groups.setdefault(root, set()).add(user)
+    return groups.values()
+
+
+def test_update_merges_components_linked_by_shared_entities():
+    graph = EntityGraph().update(TRANSACTIONS)
+    components = _components(graph)
+    assert components[1] == components[2] == components[3]
+    assert components[4] != components[1]
+
+
+def test_incremental_updates_match_one_batch():
+    incremental = EntityGraph()
+    for day in range(len(TRANSACTIONS)):
+        incremental.update(TRANSACTIONS.iloc[[day]])
+    batch = EntityGraph().update(TRANSACTIONS)
+    new = TRANSACTIONS.assign(user_id=[5, 6, 7, 8, 9])
+    pd.testing.assert_frame_equal(incremental.transform(new), batch.transform(new))
+    assert set(map(frozenset, _groups(incremental))) == set(map(frozenset, _groups(batch)))
+
+
+def test_transform_counts_the_transactions_own_links():
+    graph = EntityGraph().update(TRANSACTIONS)
+    features = graph.transform(_transactions([(5, 'A', 40, '2015-01-06', 0)]))
+    assert features['cluster_size'].iloc[0] == 5  # Users 1-3 through A, user 4 through IP 40, and user 5
+    assert features['users_per_device'].iloc[0] == 3
+    assert features['cluster_fraud_count'].iloc[0] == 2
+
+
+def test_fit_transform_does_not_see_later_links_or_labels():
+    features = EntityGraph().fit_transform(TRANSACTIONS)
+    # User 2 is only linked to user 1 by its later transaction
+    assert features['cluster_size'].iloc[1] == 1
+    assert features['cluster_fraud_count'].iloc[1] == 0
+    assert features['cluster_size'].iloc[2] == 2
+    assert features['cluster_fraud_count'].iloc[2] == 1
+    # A row's own label is not part of its features
+    assert features['cluster_fraud_count'].iloc[0] == 0
+
+    # Earlier rows' features do not change when later transactions are added
+    shuffled = TRANSACTIONS.sample(frac=1, random_state=0)
+    for end in range(1, len(TRANSACTIONS)):
+        prefix = EntityGraph().fit_transform(TRANSACTIONS.iloc[:end])
+        pd.testing.assert_frame_equal(prefix, EntityGraph().fit_transform(shuffled).loc[prefix.index])
+        assert np.array_equal(prefix.to_numpy(), features.iloc[:end].to_numpy())
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score
+
+from scripts.evaluation import ThresholdEvaluator
+
+
+@pytest.mark.parametrize('ties', [False, True])
+def test_pr_auc_matches_average_precision(ties):
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 2000)
+    scores = np.clip(0.3 * y + rng.normal(0.4, 0.2, len(y)), 0, 1)
+    if ties:
+        scores = np.round(scores, 1)  # Many equal scores, as tree ensembles produce
+    summary, _ = ThresholdEvaluator(n_bootstrap=0).evaluate(y, scores)
+    assert summary['pr_auc'] == pytest.approx(average_precision_score(y, scores))
+
+
+def test_curve_matches_sklearn_at_each_threshold():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, 500)
+    scores = np.round(rng.random(len(y)), 2)
+    _, curves = ThresholdEvaluator(n_bootstrap=0).evaluate(y, scores)
+    for row in curves.sample(20, random_state=0).itertuples():
+        predicted = scores >= row.threshold
+        assert row.precision == pytest.approx(precision_score(y, predicted))
+        assert row.recall == pytest.approx(recall_score(y, predicted))
+        assert row.f1 == pytest.approx(f1_score(y, predicted))
+
+
+def test_bootstrap_interval_contains_point_estimate():
+    rng = np.random.default_rng(2)
+    y = rng.integers(0, 2, 1000)
+    scores = np.clip(0.3 * y + rng.normal(0.4, 0.2, len(y)), 0, 1)
+    summary, _ = ThresholdEvaluator(n_bootstrap=50, n_jobs=1).evaluate(y, scores)
+    assert summary['pr_auc_ci_low'] <= summary['pr_auc'] <= summary['pr_auc_ci_high']
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.feature_transform import FeatureTransform
+
+TRANSACTIONS = pd.DataFrame({
+    'purchase_time': ['2015-01-02 12:00:00', '2015-03-04 23:30:00', '2015-05-06 01:15:00'],
+    'purchase_value': [10, 50, 120],
+    'age': [20, 35, 60],
+    'source': ['SEO', 'Ads', 'Direct'],
+    'browser': ['Chrome', 'IE', 'Safari'],
+    'sex': ['M', 'F', 'M'],
+    'country': ['USA', 'UK', 'USA'],
+})
+
+
+@pytest.fixture
+def transform():
+    return FeatureTransform().fit(TRANSACTIONS)
+
+
+def test_single_row_path_matches_batch(transform):
+    batch = transform.transform(TRANSACTIONS).to_numpy(dtype=np.float32)
+    rows = np.vstack([transform.transform_one(record) for record in TRANSACTIONS.to_dict('records')])
+    np.testing.assert_allclose(rows, batch, rtol=1e-6)
+
+
+@pytest.mark.parametrize('purchase_time', ['not a time', None])
+def test_invalid_purchase_time_is_rejected_by_both_paths(transform, purchase_time):
+    bad = TRANSACTIONS.assign(purchase_time=[TRANSACTIONS['purchase_time'][0], purchase_time, TRANSACTIONS['purchase_time'][2]])
+    with pytest.raises(ValueError, match='purchase_time'):
+        transform.transform(bad)
+    with pytest.raises(ValueError, match='purchase_time'):
+        transform.transform_one(bad.to_dict('records')[1])
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from scripts.incremental_training import IncrementalTrainer
+
+
+def _labeled(n, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    return pd.DataFrame({'f0': X[:, 0], 'f1': X[:, 1], 'f2': X[:, 2], 'class': (X[:, 0] > 0).astype(int)})
+
+
+def _trainer(model, tmp_path, **kwargs):
+    return IncrementalTrainer(model, 'model', 'fraud', state_dir=str(tmp_path / 'state'), apply_smote=False, **kwargs)
+
+
+def test_partial_fit_consumes_appended_rows_and_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / 'labeled.csv')
+    _labeled(200, 0).to_csv(path, index=False)
+    trainer = _trainer(SGDClassifier(loss='log_loss', random_state=0), tmp_path)
+    first = trainer.update(path).coef_.copy()
+    assert trainer.state['rows_consumed'] == 200
+
+    # Nothing new: the model is left alone
+    trainer.update(path)
+    assert trainer.state['n_updates'] == 1
+
+    pd.concat([_labeled(200, 0), _labeled(100, 1)]).to_csv(path, index=False)
+    resumed = _trainer(SGDClassifier(loss='log_loss', random_state=0), tmp_path)
+    np.testing.assert_array_equal(resumed.model.coef_, first)
+    assert len(resumed.load_new_batch(path)) == 100
+    resumed.update(path)
+    assert resumed.state['rows_consumed'] == 300 and resumed.state['n_updates'] == 2
+    assert not np.array_equal(resumed.model.coef_, first)
+
+
+def test_tree_ensemble_grows_by_new_trees(tmp_path):
+    path = str(tmp_path / 'labeled.csv')
+    _labeled(200, 0).to_csv(path, index=False)
+    trainer = _trainer(RandomForestClassifier(n_estimators=5, random_state=0), tmp_path, n_new_trees=3)
+    assert len(trainer.update(path).estimators_) == 5
+    pd.concat([_labeled(200, 0), _labeled(100, 1)]).to_csv(path, index=False)
+    assert len(trainer.update(path).estimators_) == 8
+
+
+def test_label_time_picks_up_late_labels_and_boundary_ties(tmp_path):
+    path = str(tmp_path / 'labeled.csv')
+    data = _labeled(6, 0).assign(txn_id=range(6), labeled_at=[1, 2, 3, 3, 3, 3])
+    data.iloc[:4].to_csv(path, index=False)
+    trainer = _trainer(SGDClassifier(loss='log_loss'), tmp_path, label_time_column='labeled_at', key_columns=['txn_id'])
+    trainer.update(path)
+    assert trainer.state['watermark'] == 3 and trainer.state['boundary_keys'] == [(2,), (3,)]
+    assert trainer.state['feature_names'] == ['f0', 'f1', 'f2']
+
+    # Rows 4 and 5 were labeled in the same second as the last update; row 6 is an old
+    # transaction labeled late
+    late = _labeled(1, 1).assign(txn_id=6, labeled_at=4)
+    pd.concat([data, late]).to_csv(path, index=False)
+    assert trainer.load_new_batch(path)['txn_id'].tolist() == [4, 5, 6]
+
+
+def test_models_without_incremental_updates_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='partial_fit'):
+        _trainer(LogisticRegression(), tmp_path)
+    with pytest.raises(ValueError, match='key_columns'):
+        _trainer(SGDClassifier(), tmp_path, label_time_column='labeled_at')
@@ -0,0 +1,23 @@
+from metrics import Metrics
+
+
+def test_render_without_extra_counters():
+    registry = Metrics(buckets=(0.1, 1.0))
+    registry.inc('fraud_predictions_total', {'outcome': 'fraud'})
+    registry.observe('fraud_model_phase_seconds', 0.05, {'phase': 'inference'})
+    text = registry.render()
+    assert 'fraud_predictions_total{outcome="fraud"} 1' in text
+    assert 'fraud_model_phase_seconds_bucket{phase="inference",le="0.1"} 1' in text
+    assert 'fraud_model_phase_seconds_bucket{phase="inference",le="+Inf"} 1' in text
+    assert 'fraud_model_phase_seconds_count{phase="inference"} 1' in text
+
+
+def test_render_with_extra_counters():
+    registry = Metrics(buckets=(0.1, 1.0))
+    registry.observe('fraud_model_load_seconds', 2.0)
+    text = registry.render({'fraud_shadow_scored_total': 7, 'fraud_shadow_errors_total': 2})
+    assert '# TYPE fraud_shadow_scored_total counter' in text
+    assert 'fraud_shadow_scored_total 7' in text
+    assert 'fraud_shadow_errors_total 2' in text
+    assert 'fraud_model_load_seconds_bucket{le="1.0"} 0' in text
+    assert 'fraud_model_load_seconds_count 1' in text
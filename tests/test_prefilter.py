@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prefilter import Prefilter, RuleSet
+
+RULES = [
+    {'name': 'instant_purchase', 'type': 'max_seconds_between', 'start': 'signup_time', 'end': 'purchase_time', 'seconds': 1},
+    {'name': 'large_purchase', 'type': 'range', 'field': 'purchase_value', 'max': 1000},
+    {'name': 'watched_country', 'type': 'in', 'field': 'country', 'values': ['Nowhere']},
+]
+
+
+@pytest.fixture
+def prefilter_dir(tmp_path):
+    (tmp_path / 'blocked_device_ids.txt').write_text("DEV1\n")
+    (tmp_path / 'blocked_ips.txt').write_text("7\n")
+    (tmp_path / 'rules.json').write_text(json.dumps(RULES))
+    return tmp_path
+
+
+RECORDS = [
+    {'device_id': 'DEV1', 'ip_address': 1.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-02 00:00:00',
+     'purchase_value': 20, 'country': 'USA'},
+    {'device_id': 'DEV2', 'ip_address': 7.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-02 00:00:00',
+     'purchase_value': 20, 'country': 'USA'},
+    {'device_id': 'DEV2', 'ip_address': 2.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-01 00:00:01',
+     'purchase_value': 20, 'country': 'USA'},
+    {'device_id': 'DEV2', 'ip_address': 2.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-02 00:00:00',
+     'purchase_value': 5000, 'country': 'Nowhere'},
+    {'device_id': 'DEV2', 'ip_address': 2.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-02 00:00:00',
+     'country': 'Nowhere'},
+    {'device_id': 'DEV3', 'ip_address': 3.0, 'signup_time': '2015-01-01 00:00:00', 'purchase_time': '2015-01-02 00:00:00',
+     'country': 'USA'},
+]
+
+
+def test_check_and_check_batch_agree(prefilter_dir):
+    prefilter = Prefilter(str(prefilter_dir))
+    reasons = [prefilter.check(record) for record in RECORDS]
+    assert reasons == ['blocked_device_id', 'blocked_ip_address', 'instant_purchase', 'large_purchase',
+                       'watched_country', None]
+    batch = prefilter.check_batch(pd.DataFrame(RECORDS)).replace({np.nan: None}).tolist()
+    assert batch == reasons
+
+
+def test_rules_on_fields_missing_from_the_payload_are_skipped():
+    rules = RuleSet(RULES)
+    assert rules.evaluate({'country': 'USA'}) is None
+    matched = rules.evaluate_batch(pd.DataFrame({'country': ['USA', 'Nowhere']}))
+    assert matched.isna().tolist() == [True, False] and matched[1] == 'watched_country'
+
+
+@pytest.mark.parametrize('rule', [
+    {'name': 'typo', 'type': 'ragne', 'field': 'purchase_value'},
+    {'name': 'incomplete', 'type': 'in', 'field': 'country'},
+    {'type': 'range', 'field': 'purchase_value'},
+])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        RuleSet([rule])
+
+
+def test_reload_swaps_in_new_lists_and_keeps_the_old_ones_on_bad_rules(prefilter_dir):
+    prefilter = Prefilter(str(prefilter_dir))
+    (prefilter_dir / 'blocked_users.txt').write_text("42\n")
+    prefilter.reload()
+    assert prefilter.check({'user_id': 42.0}) == 'blocked_user_id'
+
+    (prefilter_dir / 'rules.json').write_text(json.dumps([{'name': 'typo', 'type': 'ragne', 'field': 'age'}]))
+    with pytest.raises(ValueError):
+        prefilter.reload()
+    assert prefilter.check({'user_id': 42}) == 'blocked_user_id'
+    assert prefilter.check(RECORDS[3]) == 'large_purchase'
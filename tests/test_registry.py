@@ -0,0 +1,57 @@
+import os
+import time
+
+import joblib
+import pytest
+from sklearn.dummy import DummyClassifier
+
+from registry import ModelRegistryWatcher, build_live_model, latest_artifact, version_name
+from scripts.artifact_store import MODEL_FILE
+from scripts.serving_manifest import write_manifest
+
+
+def _mlflow_version(root, name, complete=True):
+    directory = os.path.join(root, name)
+    os.makedirs(directory)
+    model_file = os.path.join(directory, MODEL_FILE)
+    joblib.dump(DummyClassifier().fit([[0], [1]], [0, 1]), model_file)
+    if complete:
+        write_manifest(model_file, [])
+    return model_file
+
+
+def test_latest_artifact_reads_mlflow_version_directories(tmp_path):
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, 'objects'))
+    joblib.dump(DummyClassifier().fit([[0], [1]], [0, 1]), os.path.join(root, 'exported.pkl'))
+    time.sleep(0.01)
+    model_file = _mlflow_version(root, 'fraud_Random_Forest_v1.pkl')
+    artifact, mtime = latest_artifact(root)
+    assert artifact == model_file
+    assert version_name(artifact, mtime).startswith('fraud_Random_Forest_v1.pkl@')
+
+    # A version whose manifest is not stored yet is still being written
+    time.sleep(0.01)
+    _mlflow_version(root, 'fraud_Random_Forest_v2.pkl', complete=False)
+    assert latest_artifact(root)[0] == model_file
+
+
+def test_watcher_logs_a_failing_version_once(tmp_path, caplog):
+    class Live:
+        current = None
+
+        def warmup_payloads(self):
+            return []
+
+    path = str(tmp_path / 'model.pkl')
+    ModelRegistryWatcher(Live(), path, poll_interval=0.01).start()
+    with open(path, 'wb') as f:
+        f.write(b'not a model')
+    time.sleep(0.2)
+    assert len([r for r in caplog.records if 'Failed to load model version' in r.message]) == 1
+
+
+def test_missing_shadow_model_is_reported(tmp_path):
+    model_file = _mlflow_version(str(tmp_path), 'fraud_Random_Forest_v1.pkl')
+    with pytest.raises(FileNotFoundError, match='shadow'):
+        build_live_model(model_file, shadow_path=str(tmp_path / 'candidate.pkl'))
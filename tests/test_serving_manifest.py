@@ -0,0 +1,41 @@
+import joblib
+import pytest
+from sklearn.dummy import DummyClassifier
+
+from model import FraudModel
+from scripts.feature_transform import transform_path
+from scripts.serving_manifest import write_manifest
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump(DummyClassifier().fit([[0], [1]], [0, 1]), path)
+    return path
+
+
+def test_sidecars_without_manifest_are_ignored(model_path):
+    joblib.dump({'stale': True}, transform_path(model_path))
+    assert FraudModel(model_path).transform is None
+
+
+def test_sidecars_listed_for_the_model_are_loaded(model_path):
+    joblib.dump({'fitted': True}, transform_path(model_path))
+    write_manifest(model_path, [transform_path(model_path)])
+    assert FraudModel(model_path).transform == {'fitted': True}
+
+
+def test_manifest_of_another_model_is_rejected(model_path):
+    joblib.dump({'fitted': True}, transform_path(model_path))
+    write_manifest(model_path, [transform_path(model_path)])
+    joblib.dump(DummyClassifier(strategy='uniform').fit([[0], [1]], [0, 1]), model_path)
+    with pytest.raises(ValueError, match='different model'):
+        FraudModel(model_path)
+
+
+def test_replaced_sidecar_is_rejected(model_path):
+    joblib.dump({'fitted': True}, transform_path(model_path))
+    write_manifest(model_path, [transform_path(model_path)])
+    joblib.dump({'other': True}, transform_path(model_path))
+    with pytest.raises(ValueError, match='does not match'):
+        FraudModel(model_path)
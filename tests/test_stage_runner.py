@@ -0,0 +1,69 @@
+import pandas as pd
+
+from scripts.stage_runner import StageRunner
+
+
+def make_stage():
+    calls = []
+
+    def stage(df, scale):
+        calls.append(1)
+        return df * scale
+
+    return stage, calls
+
+
+def test_unchanged_stage_is_loaded_from_cache(tmp_path):
+    runner = StageRunner(cache_dir=str(tmp_path))
+    stage, calls = make_stage()
+    df = pd.DataFrame({'a': [1, 2, 3]})
+
+    first = runner.run('scale', stage, df, params={'scale': 2})
+    second = runner.run('scale', stage, df.copy(), params={'scale': 2})
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_changed_input_params_or_version_rerun(tmp_path):
+    runner = StageRunner(cache_dir=str(tmp_path))
+    stage, calls = make_stage()
+    df = pd.DataFrame({'a': [1, 2, 3]})
+
+    runner.run('scale', stage, df, params={'scale': 2})
+    runner.run('scale', stage, pd.DataFrame({'a': [1, 2, 4]}), params={'scale': 2})
+    runner.run('scale', stage, df, params={'scale': 3})
+    runner.run('scale', stage, df, params={'scale': 2}, version='v2')
+    assert len(calls) == 4
+
+
+def test_changed_input_file_reruns(tmp_path):
+    runner = StageRunner(cache_dir=str(tmp_path / 'cache'))
+    path = tmp_path / 'data.csv'
+    path.write_text("a\n1\n")
+    calls = []
+
+    def load(csv_path):
+        calls.append(1)
+        return pd.read_csv(csv_path)
+
+    runner.run('load', load, str(path))
+    runner.run('load', load, str(path))
+    path.write_text("a\n1\n2\n")
+    assert len(runner.run('load', load, str(path))) == 2
+    assert len(calls) == 2
+
+
+def test_disabled_runner_always_runs(tmp_path):
+    runner = StageRunner(cache_dir=str(tmp_path), enabled=False)
+    stage, calls = make_stage()
+    df = pd.DataFrame({'a': [1]})
+    runner.run('scale', stage, df, params={'scale': 2})
+    runner.run('scale', stage, df, params={'scale': 2})
+    assert len(calls) == 2
+
+
+def test_eviction_keeps_cache_under_max_bytes(tmp_path):
+    runner = StageRunner(cache_dir=str(tmp_path), max_bytes=0)
+    stage, _ = make_stage()
+    runner.run('scale', stage, pd.DataFrame({'a': [1]}), params={'scale': 2})
+    assert not list(tmp_path.glob('*.pkl'))